@@ -1,18 +1,114 @@
-from flask import Flask, render_template_string, request, redirect, url_for, send_from_directory, session, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, send_from_directory, session, jsonify, stream_with_context
+from markupsafe import escape
 import psycopg2
 import psycopg2.extras
 import os
+import io
+import re
+import csv
+import json
+import math
+from itertools import chain
+import base64
+import tempfile
+import threading
 import requests
-from werkzeug.utils import secure_filename
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import quote, urlsplit
+import catalog_import
+from jinja2 import DictLoader
+from db_pool import ConnectionPool
+from catalog_cache import CatalogCache
+from http_clients import CircuitBreaker, ServiceClient
+from common.compression import Compression
+from common.static_assets import StaticAssets, shared_assets
+import covers
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.secret_key = 'your-secret-key-here'  # Required for sessions
+# Fingerprinted, immutable and precompressed /static (see common/static_assets.py)
+static_assets = StaticAssets(app)
+# CSS/JS bundles shared with the cart and order pages, served at /assets
+assets = shared_assets(app)
+# gzip/brotli for HTML and JSON responses (see common/compression.py)
+compression = Compression(app)
 
 # Configuration
 CART_SERVICE_URL = os.environ.get('CART_SERVICE_URL', 'http://localhost:5002')
 ORDER_SERVICE_URL = os.environ.get('ORDER_SERVICE_URL', 'http://localhost:5001')
 USERS_SERVICE_URL = os.environ.get('USERS_SERVICE_URL', 'http://localhost:5003')
 
+# Downstream HTTP clients (one keep-alive connection pool per service)
+HTTP_MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', '20'))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '3'))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '10'))
+HTTP_POOL_TIMEOUT = float(os.environ.get('HTTP_POOL_TIMEOUT', '3'))
+# Seconds before an idempotent GET is raced with a duplicate request (0 disables)
+HTTP_HEDGE_AFTER = float(os.environ.get('HTTP_HEDGE_AFTER', '0'))
+
+# Circuit breaker configuration, applied to each downstream separately
+CIRCUIT_WINDOW_SECONDS = float(os.environ.get('CIRCUIT_WINDOW_SECONDS', '30'))
+CIRCUIT_MIN_REQUESTS = int(os.environ.get('CIRCUIT_MIN_REQUESTS', '10'))
+CIRCUIT_ERROR_RATE = float(os.environ.get('CIRCUIT_ERROR_RATE', '0.5'))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get('CIRCUIT_SLOW_CALL_SECONDS', '5'))
+CIRCUIT_SLOW_CALL_RATE = float(os.environ.get('CIRCUIT_SLOW_CALL_RATE', '0.5'))
+CIRCUIT_OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS', '15'))
+
+def make_service_client(name, base_url, read_timeout=HTTP_READ_TIMEOUT):
+    breaker = CircuitBreaker(
+        name,
+        window_seconds=CIRCUIT_WINDOW_SECONDS,
+        min_requests=CIRCUIT_MIN_REQUESTS,
+        error_rate=CIRCUIT_ERROR_RATE,
+        slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+        slow_call_rate=CIRCUIT_SLOW_CALL_RATE,
+        open_seconds=CIRCUIT_OPEN_SECONDS
+    )
+    return ServiceClient(
+        name,
+        base_url,
+        max_connections=HTTP_MAX_CONNECTIONS,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=read_timeout,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        breaker=breaker,
+        hedge_after=HTTP_HEDGE_AFTER
+    )
+
+cart_client = make_service_client('cart', CART_SERVICE_URL)
+users_client = make_service_client('users', USERS_SERVICE_URL)
+order_client = make_service_client('order', ORDER_SERVICE_URL, read_timeout=5)
+
+# Proxied responses are relayed to the browser as they arrive
+RELAY_CHUNK_SIZE = int(os.environ.get('RELAY_CHUNK_SIZE', '16384'))
+# Longest a relayed payment status long-poll may wait; keep in step with the cart service
+PAYMENT_LONG_POLL_SECONDS = float(os.environ.get('PAYMENT_LONG_POLL_SECONDS', '5'))
+# Hop-by-hop headers (RFC 7230) apply to the downstream connection only, and a
+# downstream's session cookie must not overwrite the store's own.
+RELAY_EXCLUDED_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade', 'set-cookie'
+}
+
+def relay_headers():
+    """Request headers forwarded to a downstream whose response is relayed as-is"""
+    # The body is passed through still encoded, so the downstream may only
+    # use an encoding the browser understands.
+    return {'Accept-Encoding': request.headers.get('Accept-Encoding', 'identity')}
+
+def relay(upstream):
+    """Stream a downstream response to the client chunk by chunk, headers intact"""
+    headers = [(name, value) for name, value in upstream.raw.headers.items()
+               if name.lower() not in RELAY_EXCLUDED_HEADERS]
+    response = Response(upstream.raw.stream(RELAY_CHUNK_SIZE, decode_content=False),
+                        status=upstream.status_code, headers=headers)
+    # Werkzeug never iterates the body of a HEAD, 204 or 304 response, only
+    # closes it, so the upstream (and its connection slot) is released on
+    # close rather than when the body runs out.
+    response.call_on_close(upstream.close)
+    return response
+
 # Database configuration
 DB_HOST = os.environ.get('DB_HOST', 'localhost')
 DB_PORT = os.environ.get('DB_PORT', '5432')
@@ -21,15 +117,265 @@ DB_USER = os.environ.get('DB_USER', 'music_user')
 DB_PASSWORD = os.environ.get('DB_PASSWORD', 'music_password')
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'static', 'covers')
 
+# Connection pool configuration
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', '300'))
+DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', '3600'))
+
+db_pool = ConnectionPool(
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    max_idle=DB_POOL_MAX_IDLE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    host=DB_HOST,
+    port=DB_PORT,
+    database=DB_NAME,
+    user=DB_USER,
+    password=DB_PASSWORD
+)
+
 def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
-    )
+    """Borrow a pooled database connection (use as a context manager)"""
+    return db_pool.connection()
+
+# Catalog cache; the TTL only matters for writes made through other replicas
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', '30'))
+# Filtered pages and facet counts are cached per filter combination
+CATALOG_CACHE_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '1000'))
+catalog_cache = CatalogCache(ttl=CATALOG_CACHE_TTL, max_entries=CATALOG_CACHE_MAX_ENTRIES)
+
+def load_all_albums():
+    """Fetch the full album catalog, newest first"""
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute('SELECT * FROM albums ORDER BY created_at DESC')
+            return tuple(cur.fetchall())
+
+def get_catalog():
+    """Return the cached album catalog snapshot"""
+    return catalog_cache.get('albums', load_all_albums)
+
+# Album listing pagination
+ALBUMS_PAGE_SIZE = int(os.environ.get('ALBUMS_PAGE_SIZE', '24'))
+ALBUMS_MAX_PAGE_SIZE = int(os.environ.get('ALBUMS_MAX_PAGE_SIZE', '100'))
+
+# Sort keys accepted by /api/albums: column and direction, ties broken by id
+ALBUM_SORTS = {
+    'newest': ('created_at', 'DESC'),
+    'price_asc': ('price', 'ASC'),
+    'price_desc': ('price', 'DESC'),
+    'name': ('name', 'ASC'),
+}
+SORT_LABELS = {'newest': 'Newest', 'price_asc': 'Price: low to high', 'price_desc': 'Price: high to low', 'name': 'Name'}
+# Price facet: (key, label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = (
+    ('under-20', 'Under $20', None, 20),
+    ('20-25', '$20 - $25', 20, 25),
+    ('25-30', '$25 - $30', 25, 30),
+    ('30-plus', '$30 and up', 30, None),
+)
+PRICE_BUCKETS_BY_KEY = {bucket[0]: bucket for bucket in PRICE_BUCKETS}
+# Number of artists listed in the artist facet, most albums first
+FACET_ARTIST_LIMIT = int(os.environ.get('FACET_ARTIST_LIMIT', '50'))
+CURSOR_TYPES = {'created_at': datetime.fromisoformat, 'price': Decimal, 'name': str}
+
+def encode_cursor(row, key='created_at'):
+    """Encode the (sort key, id) keyset position of a row as an opaque cursor"""
+    value = row[key]
+    raw = f"{value.isoformat() if isinstance(value, datetime) else value}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, key='created_at'):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, album_id = raw.rsplit('|', 1)
+        return CURSOR_TYPES[key](value), int(album_id)
+    except (ValueError, ArithmeticError):
+        raise ValueError('Invalid cursor')
+
+def album_filters(artists=(), price_buckets=()):
+    """WHERE clauses and parameters for the artist and price facets"""
+    clauses = []
+    params = []
+    if artists:
+        clauses.append('artist = ANY(%s)')
+        params.append(list(artists))
+    if price_buckets:
+        ranges = []
+        for key in price_buckets:
+            _, _, low, high = PRICE_BUCKETS_BY_KEY[key]
+            bounds = []
+            if low is not None:
+                bounds.append('price >= %s')
+                params.append(low)
+            if high is not None:
+                bounds.append('price < %s')
+                params.append(high)
+            ranges.append(' AND '.join(bounds))
+        clauses.append('(' + ' OR '.join(f'({r})' for r in ranges) + ')')
+    return clauses, params
+
+def fetch_album_page(cursor=None, limit=ALBUMS_PAGE_SIZE, sort='newest', artists=(), price_buckets=()):
+    """Fetch one page of albums in ``sort`` order, starting after ``cursor``.
+
+    Returns ``(albums, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    column, direction = ALBUM_SORTS[sort]
+    clauses, params = album_filters(artists, price_buckets)
+    if cursor:
+        clauses.append(f"({column}, id) {'<' if direction == 'DESC' else '>'} (%s, %s)")
+        params.extend(decode_cursor(cursor, column))
+    where = 'WHERE ' + ' AND '.join(clauses) if clauses else ''
+    params.append(limit + 1)
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(f'''SELECT * FROM albums {where}
+                           ORDER BY {column} {direction}, id {direction}
+                           LIMIT %s''', params)
+            rows = cur.fetchall()
+    albums = tuple(rows[:limit])
+    next_cursor = encode_cursor(albums[-1], column) if len(rows) > limit else None
+    return albums, next_cursor
+
+def fetch_facet_counts(artists=(), price_buckets=()):
+    """Album counts per artist and per price bucket.
+
+    Each facet is counted with the other facet's selection applied but not
+    its own, so every option shows how many albums choosing it would list.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            clauses, params = album_filters(price_buckets=price_buckets)
+            where = 'WHERE ' + ' AND '.join(clauses) if clauses else ''
+            cur.execute(f'''SELECT artist, count(*) FROM albums {where}
+                           GROUP BY artist
+                           ORDER BY count(*) DESC, artist
+                           LIMIT %s''', params + [FACET_ARTIST_LIMIT])
+            artist_counts = cur.fetchall()
+
+            clauses, params = album_filters(artists=artists)
+            where = 'WHERE ' + ' AND '.join(clauses) if clauses else ''
+            bucket_counts = []
+            bucket_params = []
+            for key, _, _, _ in PRICE_BUCKETS:
+                bucket_clauses, params_for_bucket = album_filters(price_buckets=[key])
+                bucket_counts.append(f'count(*) FILTER (WHERE {bucket_clauses[0]})')
+                bucket_params.extend(params_for_bucket)
+            cur.execute(f"SELECT {', '.join(bucket_counts)} FROM albums {where}", bucket_params + params)
+            price_counts = cur.fetchone()
+    return {
+        'artist': [{'value': artist, 'count': count} for artist, count in artist_counts],
+        'price': [{'value': key, 'label': label, 'count': count}
+                  for (key, label, _, _), count in zip(PRICE_BUCKETS, price_counts)],
+    }
+
+def get_first_page(limit=ALBUMS_PAGE_SIZE, sort='newest', artists=(), price_buckets=()):
+    """Cached first page for a sort and filter combination"""
+    return catalog_cache.get(('page', limit, sort, artists, price_buckets),
+                             lambda: fetch_album_page(None, limit, sort, artists, price_buckets))
+
+def get_facet_counts(artists=(), price_buckets=()):
+    """Cached facet counts; dropped with the rest of the catalog cache on album writes"""
+    return catalog_cache.get(('facets', artists, price_buckets),
+                             lambda: fetch_facet_counts(artists, price_buckets))
+
+# Recent orders feed
+RECENT_ORDERS_PAGE_SIZE = int(os.environ.get('RECENT_ORDERS_PAGE_SIZE', '10'))
+RECENT_ORDERS_MAX_PAGE_SIZE = int(os.environ.get('RECENT_ORDERS_MAX_PAGE_SIZE', '50'))
+RECENT_ORDERS_CACHE_TTL = float(os.environ.get('RECENT_ORDERS_CACHE_TTL', '5'))
+recent_orders_cache = CatalogCache(ttl=RECENT_ORDERS_CACHE_TTL)
+
+def fetch_recent_orders(cursor=None, limit=RECENT_ORDERS_PAGE_SIZE):
+    """Fetch one page of the most recent orders, walking idx_orders_created_at.
+
+    Returns ``(orders, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    params = []
+    where = ''
+    if cursor:
+        where = 'WHERE (orders.created_at, orders.id) < (%s, %s)'
+        params.extend(decode_cursor(cursor))
+    params.append(limit + 1)
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(f'''SELECT orders.id, orders.created_at, albums.name, albums.artist,
+                                  orders.quantity, albums.price
+                           FROM orders JOIN albums ON orders.album_id = albums.id
+                           {where}
+                           ORDER BY orders.created_at DESC, orders.id DESC
+                           LIMIT %s''', params)
+            rows = cur.fetchall()
+    orders = tuple(rows[:limit])
+    next_cursor = encode_cursor(orders[-1]) if len(rows) > limit else None
+    return orders, next_cursor
+
+ALBUMS_MAX_BATCH_SIZE = int(os.environ.get('ALBUMS_MAX_BATCH_SIZE', '100'))
+
+def fetch_albums_by_ids(album_ids):
+    """Fetch several albums in one query, returned as a dict keyed by id"""
+    if not album_ids:
+        return {}
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute('SELECT * FROM albums WHERE id = ANY(%s)', (list(album_ids),))
+            return {album['id']: album for album in cur.fetchall()}
+
+# Album search
+SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', '10'))
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', '50'))
+# pg_trgm word similarity a typo'd query needs to reach (0-1)
+SEARCH_FUZZY_THRESHOLD = float(os.environ.get('SEARCH_FUZZY_THRESHOLD', '0.5'))
+SEARCH_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+def build_prefix_tsquery(terms):
+    """'iron maid' -> 'iron:* & maid:*': every word matches as a prefix, for autocomplete"""
+    return ' & '.join(f'{term}:*' for term in terms)
+
+def search_albums(query, limit=SEARCH_PAGE_SIZE):
+    """Rank albums matching ``query`` by name and artist.
+
+    Full-text prefix matches on the generated ``search_vector`` column come
+    first, ranked by ts_rank_cd (name hits weigh more than artist hits). If
+    they don't fill the page, the rest is made up of trigram matches on
+    name and artist, which tolerate typos. Both steps are answered from GIN
+    indexes, so neither scans the table.
+    """
+    terms = [term.lower() for term in SEARCH_TERM_RE.findall(query)]
+    if not terms:
+        return []
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute('''SELECT *, ts_rank_cd(search_vector, query) AS score, 'text' AS match
+                           FROM albums, to_tsquery('simple', %s) AS query
+                           WHERE search_vector @@ query
+                           ORDER BY score DESC, id DESC
+                           LIMIT %s''', (build_prefix_tsquery(terms), limit))
+            results = cur.fetchall()
+            if len(results) < limit:
+                cur.execute('SET LOCAL pg_trgm.word_similarity_threshold = %s', (SEARCH_FUZZY_THRESHOLD,))
+                text = ' '.join(terms)
+                cur.execute('''SELECT *, word_similarity(%s, name || ' ' || artist) AS score, 'fuzzy' AS match
+                               FROM albums
+                               WHERE %s <%% (name || ' ' || artist) AND NOT (id = ANY(%s))
+                               ORDER BY score DESC, id DESC
+                               LIMIT %s''', (text, text, [album['id'] for album in results], limit - len(results)))
+                results.extend(cur.fetchall())
+    return results
+
+def album_to_dict(album):
+    """Serialize an album row for the JSON API"""
+    return {
+        'id': album['id'],
+        'name': album['name'],
+        'artist': album['artist'],
+        'price': float(album['price']),
+        'cover_url': static_assets.versioned(album['cover_url']),
+        'cover_variants': album.get('cover_variants')
+    }
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif'}
@@ -37,6 +383,7 @@ def allowed_file(filename):
 # Ensure upload folder exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.add_template_filter(covers.srcset, 'srcset')
 
 @app.route('/test-static')
 def test_static():
@@ -49,28 +396,113 @@ def test_static():
     <img src="/static/covers/Sound_garden-Superunknown.jpg" alt="Soundgarden" style="width: 200px;">
     '''
 
+# Catalog exports stream rows from a server-side cursor this many at a time
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', '2000'))
+# An export holds a pooled connection until the download finishes, so only a
+# few may run at once, and PostgreSQL ends one whose client stops reading
+EXPORT_MAX_CONCURRENT = int(os.environ.get('EXPORT_MAX_CONCURRENT', '2'))
+EXPORT_IDLE_TIMEOUT = float(os.environ.get('EXPORT_IDLE_TIMEOUT', '60'))
+export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
+EXPORT_COLUMNS = ('id', 'name', 'artist', 'price', 'cover_url', 'created_at')
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'html': 'text/html',
+}
+
+def iter_album_batches(fetch_size=EXPORT_FETCH_SIZE):
+    """Yield the whole catalog in id order, ``fetch_size`` rows at a time.
+    
+    A named cursor keeps the result set on the PostgreSQL side, so only one
+    batch is ever held here however large the catalog is.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # Between batches the transaction idles while the client downloads
+            cur.execute('SET LOCAL idle_in_transaction_session_timeout = %s', (int(EXPORT_IDLE_TIMEOUT * 1000),))
+        with conn.cursor(name='album_export', cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.itersize = fetch_size
+            cur.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM albums ORDER BY id")
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield rows
+
+def export_ndjson(batches):
+    for rows in batches:
+        yield ''.join(json.dumps({
+            'id': album['id'],
+            'name': album['name'],
+            'artist': album['artist'],
+            'price': float(album['price']),
+            'cover_url': album['cover_url'],
+            'created_at': album['created_at'].isoformat() if album['created_at'] else None
+        }) + '\n' for album in rows)
+
+def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows([album[column] for column in EXPORT_COLUMNS] for album in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def export_html(batches):
+    yield '<h1>Database Debug</h1><h2>Albums in Database:</h2>'
+    for rows in batches:
+        yield ''.join(f'''
+            <div style="border: 1px solid #ccc; margin: 10px; padding: 10px;">
+                <h3>{escape(album['name'])} - {escape(album['artist'])}</h3>
+                <p>Price: ${album['price']}</p>
+                <p>Cover URL: {escape(album['cover_url'])}</p>
+                <img src="{escape(album['cover_url'] or '')}" alt="{escape(album['name'])}" style="width: 200px; border: 1px solid red;">
+            </div>
+            ''' for album in rows)
+
+EXPORTERS = {'ndjson': export_ndjson, 'csv': export_csv, 'html': export_html}
+
+def export_catalog(fmt):
+    """Stream the full catalog as a generator response in constant memory"""
+    if not export_slots.acquire(blocking=False):
+        return jsonify({'error': f'Too many catalog exports in progress (limit {EXPORT_MAX_CONCURRENT}); try again shortly'}), 503
+    try:
+        batches = iter_album_batches()
+        # Fetch the first batch before answering, so a database error still
+        # becomes an error response instead of a truncated 200.
+        first = next(batches, None)
+    except BaseException:
+        export_slots.release()
+        raise
+
+    body = EXPORTERS[fmt](chain([first] if first else [], batches))
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt])
+    # Runs even if the client disconnects early or the body is never read
+    # (HEAD), handing the connection and the export slot back
+    response.call_on_close(batches.close)
+    response.call_on_close(export_slots.release)
+    if fmt != 'html':
+        response.headers['Content-Disposition'] = f'attachment; filename=albums.{fmt}'
+    return response
+
+@app.route('/api/albums/export')
+def export_albums():
+    """API endpoint streaming the whole catalog as NDJSON, CSV or HTML"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORTERS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORTERS)}"}), 400
+    return export_catalog(fmt)
+
 @app.route('/debug-db')
 def debug_db():
     """Debug database content"""
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute('SELECT * FROM albums')
-                albums = cur.fetchall()
-        
-        html = '<h1>Database Debug</h1><h2>Albums in Database:</h2>'
-        for album in albums:
-            html += f'''
-            <div style="border: 1px solid #ccc; margin: 10px; padding: 10px;">
-                <h3>{album['name']} - {album['artist']}</h3>
-                <p>Price: ${album['price']}</p>
-                <p>Cover URL: {album['cover_url']}</p>
-                <img src="{album['cover_url']}" alt="{album['name']}" style="width: 200px; border: 1px solid red;">
-            </div>
-            '''
-        return html
+        return export_catalog('html')
     except Exception as e:
-        return f'<h1>Database Error</h1><p>Error: {str(e)}</p>'
+        return f'<h1>Database Error</h1><p>Error: {escape(str(e))}</p>'
 
 # Main HTML Template
 INDEX_HTML = '''
@@ -81,572 +513,8 @@ INDEX_HTML = '''
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Metal Music Store - Brutal Collection</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #ffffff;
-            color: #1a1a1a;
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-
-        /* Header */
-        .header {
-            background: #1a1a1a;
-            color: white;
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            box-shadow: 0 2px 20px rgba(0,0,0,0.3);
-        }
-
-        .header-content {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-
-        .logo {
-            font-size: 1.8rem;
-            font-weight: 800;
-            text-decoration: none;
-            color: white;
-            letter-spacing: -0.5px;
-        }
-
-        .nav-actions {
-            display: flex;
-            gap: 20px;
-            align-items: center;
-        }
-
-        .cart-link {
-            background: rgba(255,255,255,0.2);
-            color: white;
-            padding: 12px 24px;
-            border-radius: 8px;
-            text-decoration: none;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            backdrop-filter: blur(10px);
-        }
-
-        .cart-link:hover {
-            background: rgba(255,255,255,0.3);
-            transform: translateY(-1px);
-        }
-
-        .admin-button {
-            background: rgba(255,255,255,0.1);
-            color: white;
-            border: 1px solid rgba(255,255,255,0.3);
-            padding: 12px 20px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            text-decoration: none;
-        }
-
-        .admin-button:hover {
-            background: rgba(255,255,255,0.2);
-            transform: translateY(-1px);
-        }
-
-        /* Hero Section */
-        .hero {
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            padding: 80px 0;
-            text-align: center;
-            margin-bottom: 60px;
-        }
-
-        .hero h1 {
-            font-size: 3.5rem;
-            font-weight: 800;
-            margin-bottom: 20px;
-            color: #1a1a1a;
-            letter-spacing: -1px;
-        }
-
-        .hero p {
-            font-size: 1.3rem;
-            color: #666;
-            max-width: 600px;
-            margin: 0 auto;
-            font-weight: 400;
-        }
-
-        /* Main Content */
-        .main-content {
-            padding: 40px 0;
-        }
-
-        .section-header {
-            text-align: center;
-            margin-bottom: 60px;
-        }
-
-        .section-title {
-            font-size: 2.5rem;
-            font-weight: 700;
-            color: #1a1a1a;
-            margin-bottom: 16px;
-            letter-spacing: -0.5px;
-        }
-
-        .section-subtitle {
-            font-size: 1.1rem;
-            color: #666;
-            max-width: 600px;
-            margin: 0 auto;
-        }
-
-        /* Album Grid */
-        .album-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(280px, 1fr));
-            gap: 30px;
-            margin-bottom: 80px;
-        }
-
-        .album-card {
-            background: white;
-            border-radius: 16px;
-            overflow: hidden;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-            transition: all 0.3s ease;
-            position: relative;
-        }
-
-        .album-card:hover {
-            transform: translateY(-8px);
-            box-shadow: 0 20px 40px rgba(0,0,0,0.12);
-        }
-
-        .album-cover-container {
-            position: relative;
-            overflow: hidden;
-            aspect-ratio: 1;
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        }
-
-        .album-cover {
-            width: 100%;
-            height: 100%;
-            object-fit: cover;
-            transition: transform 0.3s ease;
-        }
-
-        .album-card:hover .album-cover {
-            transform: scale(1.05);
-        }
-
-        .album-cover-placeholder {
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            height: 100%;
-            color: #999;
-            font-size: 0.9rem;
-            font-weight: 500;
-            text-align: center;
-            padding: 20px;
-        }
-
-        .album-info {
-            padding: 24px;
-        }
-
-        .album-title {
-            font-size: 1.2rem;
-            font-weight: 700;
-            color: #1a1a1a;
-            margin-bottom: 8px;
-            line-height: 1.3;
-        }
-
-        .album-artist {
-            font-size: 1rem;
-            color: #666;
-            margin-bottom: 16px;
-            font-weight: 500;
-        }
-
-        .album-price {
-            font-size: 1.4rem;
-            font-weight: 800;
-            color: #667eea;
-            margin-bottom: 20px;
-        }
-
-        .album-actions {
-            display: flex;
-            gap: 12px;
-            align-items: center;
-        }
-
-        .quantity-input {
-            width: 80px;
-            padding: 12px;
-            border: 2px solid #e1e5e9;
-            border-radius: 8px;
-            font-size: 1rem;
-            font-weight: 500;
-            text-align: center;
-            transition: border-color 0.3s ease;
-        }
-
-        .quantity-input:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-
-        .add-to-cart-btn {
-            flex: 1;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 14px 20px;
-            border-radius: 8px;
-            font-size: 1rem;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-
-        .add-to-cart-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        /* Empty State */
-        .empty-state {
-            text-align: center;
-            padding: 80px 20px;
-            color: #666;
-        }
-
-        .empty-state h3 {
-            font-size: 1.5rem;
-            margin-bottom: 16px;
-            color: #1a1a1a;
-        }
-
-        .empty-state p {
-            font-size: 1.1rem;
-            max-width: 500px;
-            margin: 0 auto;
-        }
-
-        /* Login Modal */
-        .login-modal {
-            display: none;
-            position: fixed;
-            z-index: 1000;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(0,0,0,0.5);
-            backdrop-filter: blur(5px);
-        }
-
-        .login-content {
-            background: white;
-            margin: 10% auto;
-            padding: 40px;
-            border-radius: 16px;
-            width: 90%;
-            max-width: 400px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.2);
-        }
-
-        .login-header {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-
-        .login-title {
-            font-size: 1.8rem;
-            font-weight: 700;
-            color: #1a1a1a;
-            margin-bottom: 8px;
-        }
-
-        .login-subtitle {
-            color: #666;
-            font-size: 1rem;
-        }
-
-        .close {
-            position: absolute;
-            top: 20px;
-            right: 20px;
-            font-size: 24px;
-            font-weight: bold;
-            color: #999;
-            cursor: pointer;
-            transition: color 0.3s ease;
-        }
-
-        .close:hover {
-            color: #1a1a1a;
-        }
-
-        .login-form {
-            display: flex;
-            flex-direction: column;
-            gap: 20px;
-        }
-
-        .form-group {
-            display: flex;
-            flex-direction: column;
-            gap: 8px;
-        }
-
-        .form-group label {
-            font-weight: 600;
-            color: #1a1a1a;
-            font-size: 0.9rem;
-        }
-
-        .form-group input {
-            padding: 14px 16px;
-            border: 2px solid #e1e5e9;
-            border-radius: 8px;
-            font-size: 1rem;
-            transition: border-color 0.3s ease;
-        }
-
-        .form-group input:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-
-        .login-btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 16px;
-            border-radius: 8px;
-            font-size: 1rem;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            margin-top: 10px;
-        }
-
-        .login-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        .error-message {
-            color: #e74c3c;
-            text-align: center;
-            margin: 10px 0;
-            display: none;
-            font-size: 0.9rem;
-        }
-
-        /* Cart Notification */
-        .cart-notification {
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            background: white;
-            border-radius: 12px;
-            padding: 24px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.15);
-            z-index: 1000;
-            transform: translateX(400px);
-            transition: transform 0.3s ease;
-            max-width: 320px;
-            border: 1px solid #e1e5e9;
-        }
-
-        .cart-notification.show {
-            transform: translateX(0);
-        }
-
-        .cart-notification h3 {
-            color: #1a1a1a;
-            margin-bottom: 12px;
-            font-size: 1.2rem;
-            font-weight: 700;
-        }
-
-        .cart-notification p {
-            color: #666;
-            margin-bottom: 20px;
-            line-height: 1.5;
-        }
-
-        .cart-notification .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 12px 20px;
-            border-radius: 8px;
-            font-size: 0.9rem;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            text-decoration: none;
-            display: inline-block;
-            margin-right: 10px;
-        }
-
-        .cart-notification .btn:hover {
-            transform: translateY(-1px);
-            box-shadow: 0 5px 15px rgba(102, 126, 234, 0.3);
-        }
-
-        .cart-notification .btn-secondary {
-            background: #f8f9fa;
-            color: #666;
-            border: 1px solid #e1e5e9;
-        }
-
-        .cart-notification .btn-secondary:hover {
-            background: #e9ecef;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        }
-
-        /* Timeout Notification */
-        .timeout-notification {
-            position: fixed;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%) scale(0.8);
-            background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%);
-            color: white;
-            border-radius: 12px;
-            padding: 24px;
-            box-shadow: 0 10px 40px rgba(231, 76, 60, 0.4);
-            z-index: 2000;
-            transition: transform 0.3s ease, opacity 0.3s ease;
-            max-width: 400px;
-            width: 90%;
-            border: 2px solid rgba(255,255,255,0.2);
-            opacity: 0;
-        }
-
-        .timeout-notification.show {
-            transform: translate(-50%, -50%) scale(1);
-            opacity: 1;
-        }
-
-        .timeout-notification h3 {
-            color: white;
-            margin-bottom: 12px;
-            font-size: 1.3rem;
-            font-weight: 700;
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }
-
-        .timeout-notification p {
-            color: rgba(255,255,255,0.95);
-            margin-bottom: 20px;
-            line-height: 1.5;
-            font-size: 1rem;
-        }
-
-        .timeout-notification button {
-            background: white;
-            color: #e74c3c;
-            border: none;
-            padding: 12px 24px;
-            border-radius: 8px;
-            font-size: 0.95rem;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            width: 100%;
-        }
-
-        .timeout-notification button:hover {
-            background: #f8f9fa;
-            transform: translateY(-1px);
-            box-shadow: 0 5px 15px rgba(0,0,0,0.2);
-        }
-
-        /* Responsive Design */
-        @media (max-width: 768px) {
-            .container {
-                padding: 0 16px;
-            }
-
-            .hero {
-                padding: 60px 0;
-            }
-
-            .hero h1 {
-                font-size: 2.5rem;
-            }
-
-            .hero p {
-                font-size: 1.1rem;
-            }
-
-            .section-title {
-                font-size: 2rem;
-            }
-
-            .album-grid {
-                grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
-                gap: 20px;
-            }
-
-            .header-content {
-                flex-direction: column;
-                gap: 20px;
-            }
-
-            .nav-actions {
-                width: 100%;
-                justify-content: center;
-            }
-        }
-
-        @media (max-width: 480px) {
-            .album-grid {
-                grid-template-columns: 1fr;
-            }
-
-            .hero h1 {
-                font-size: 2rem;
-            }
-
-            .album-actions {
-                flex-direction: column;
-                gap: 16px;
-            }
-
-            .quantity-input {
-                width: 100%;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/store.css') }}">
 </head>
 <body>
     <!-- Header -->
@@ -679,12 +547,37 @@ INDEX_HTML = '''
             </div>
 
             {% if albums %}
-            <div class="album-grid">
+            <form class="catalog-filters" id="catalogFilters">
+                <label>Sort
+                    <select name="sort">
+                        {% for key, label in sorts.items() %}<option value="{{key}}">{{label}}</option>{% endfor %}
+                    </select>
+                </label>
+                <label>Artist
+                    <select name="artist">
+                        <option value="">All artists</option>
+                        {% for f in facets.artist %}<option value="{{f.value}}">{{f.value}} ({{f.count}})</option>{% endfor %}
+                    </select>
+                </label>
+                <label>Price
+                    <select name="price">
+                        <option value="">Any price</option>
+                        {% for f in facets.price %}<option value="{{f.value}}">{{f.label}} ({{f.count}})</option>{% endfor %}
+                    </select>
+                </label>
+            </form>
+            <div class="album-grid" id="albumGrid">
                 {% for a in albums %}
                 <div class="album-card">
                     <div class="album-cover-container">
-                        {% if a.cover_url %}
-                        <img src="{{a.cover_url}}" alt="{{a.name}} cover" class="album-cover" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
+                        {% if a.cover_variants %}
+                        <picture class="album-cover-picture">
+                            <source type="image/webp" srcset="{{a.cover_variants.webp|srcset}}" sizes="(max-width: 480px) 100vw, 400px">
+                            <img src="{{a.cover_variants.jpeg[0].url}}" srcset="{{a.cover_variants.jpeg|srcset}}" sizes="(max-width: 480px) 100vw, 400px" alt="{{a.name}} cover" class="album-cover" {% if loop.index > 6 %}loading="lazy" {% endif %}onerror="this.parentElement.style.display='none'; this.parentElement.nextElementSibling.style.display='flex';">
+                        </picture>
+                        <div class="album-cover-placeholder" style="display: none;">{{a.name}}</div>
+                        {% elif a.cover_url %}
+                        <img src="{{a.cover_url|versioned}}" alt="{{a.name}} cover" class="album-cover" {% if loop.index > 6 %}loading="lazy" {% endif %}onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
                         <div class="album-cover-placeholder" style="display: none;">{{a.name}}</div>
                         {% else %}
                         <div class="album-cover-placeholder">{{a.name}}</div>
@@ -707,12 +600,22 @@ INDEX_HTML = '''
                 </div>
                 {% endfor %}
             </div>
+            <p class="catalog-filters-empty" id="albumGridEmpty" hidden>No albums match these filters.</p>
+            <div id="albumGridSentinel" class="album-grid-sentinel" data-next-cursor="{{next_cursor or ''}}" data-query=""></div>
             {% else %}
             <div class="empty-state">
                 <h3>No albums available</h3>
                 <p>No brutal metal albums available yet. Contact the store administrator to add some albums!</p>
             </div>
             {% endif %}
+
+            <section class="recent-orders" id="recentOrders">
+                <div class="section-header">
+                    <h2 class="section-title">🔥 Recently Ordered</h2>
+                    <p class="section-subtitle">What other metalheads are buying</p>
+                </div>
+                <ul class="recent-orders-list" id="recentOrdersList"></ul>
+            </section>
         </div>
     </main>
 
@@ -739,220 +642,7 @@ INDEX_HTML = '''
         </div>
     </div>
 
-    <script>
-        function showTab(tabName) {
-            // Hide all content sections
-            const contentSections = document.querySelectorAll('.content-section');
-            contentSections.forEach(section => {
-                section.classList.remove('active');
-            });
-            
-            // Remove active class from all tabs
-            const tabs = document.querySelectorAll('.tab');
-            tabs.forEach(tab => {
-                tab.classList.remove('active');
-            });
-            
-            // Show selected content section
-            document.getElementById(tabName).classList.add('active');
-            
-            // Add active class to clicked tab
-            event.target.classList.add('active');
-        }
-
-        function showLoginModal() {
-            document.getElementById('loginModal').style.display = 'block';
-            document.getElementById('username').focus();
-        }
-
-        function closeLoginModal() {
-            document.getElementById('loginModal').style.display = 'none';
-            document.getElementById('loginError').style.display = 'none';
-            document.getElementById('username').value = '';
-            document.getElementById('password').value = '';
-        }
-
-        function handleLogin(event) {
-            event.preventDefault();
-            
-            const username = document.getElementById('username').value;
-            const password = document.getElementById('password').value;
-            const errorDiv = document.getElementById('loginError');
-            
-            // Call login API
-            fetch('/api/login', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    username: username,
-                    password: password
-                })
-            })
-            .then(response => {
-                if (!response.ok && response.status === 504) {
-                    return response.json().then(data => {
-                        throw new Error('TIMEOUT');
-                    });
-                }
-                return response.json();
-            })
-            .then(data => {
-                if (data.success) {
-                    // Store token in localStorage
-                    localStorage.setItem('adminToken', data.token);
-                    localStorage.setItem('adminUser', JSON.stringify(data.user));
-                    
-                    // Close modal and redirect to admin page
-                    closeLoginModal();
-                    window.location.href = '/admin';
-                } else if (data.timeout) {
-                    showTimeoutNotification(data.service || 'users');
-                    errorDiv.textContent = 'Service timeout. Please try again.';
-                    errorDiv.style.display = 'block';
-                } else {
-                    errorDiv.textContent = data.error || 'Login failed';
-                    errorDiv.style.display = 'block';
-                }
-            })
-            .catch(error => {
-                console.error('Error:', error);
-                if (error.message === 'TIMEOUT') {
-                    showTimeoutNotification('users');
-                    errorDiv.textContent = 'Service timeout. Please try again.';
-                    errorDiv.style.display = 'block';
-                } else {
-                    errorDiv.textContent = 'Login failed. Please try again.';
-                    errorDiv.style.display = 'block';
-                }
-            });
-            
-            return false;
-        }
-
-        // Close modal when clicking outside of it
-        window.onclick = function(event) {
-            const modal = document.getElementById('loginModal');
-            if (event.target == modal) {
-                closeLoginModal();
-            }
-        }
-
-        function addToCart(event, form) {
-            event.preventDefault();
-            
-            const formData = new FormData(form);
-            
-            // Set timeout for the fetch request
-            const timeoutPromise = new Promise((_, reject) => {
-                setTimeout(() => reject(new Error('Request timeout')), 10000);
-            });
-            
-            fetch('/add_to_cart', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => {
-                if (!response.ok && response.status === 504) {
-                    return response.json().then(data => {
-                        throw new Error('TIMEOUT');
-                    });
-                }
-                return response.json();
-            })
-            .then(data => {
-                if (data.success) {
-                    showCartNotification(data.redirect_url);
-                } else if (data.timeout) {
-                    showTimeoutNotification(data.service || 'cart');
-                } else {
-                    alert('Error adding to cart: ' + data.error);
-                }
-            })
-            .catch(error => {
-                console.error('Error:', error);
-                if (error.message === 'TIMEOUT' || error.message === 'Request timeout') {
-                    showTimeoutNotification('cart');
-                } else {
-                    alert('Error adding to cart');
-                }
-            });
-            
-            return false;
-        }
-
-        function showCartNotification(redirectUrl) {
-            // Remove existing notification
-            const existing = document.querySelector('.cart-notification');
-            if (existing) {
-                existing.remove();
-            }
-            
-            // Create notification
-            const notification = document.createElement('div');
-            notification.className = 'cart-notification';
-            notification.innerHTML = `
-                <h3>🤘 Item Added!</h3>
-                <p>Your brutal metal album has been added to the cart!</p>
-                <a href="/cart" class="btn">View Cart</a>
-                <button class="btn btn-secondary" onclick="this.parentElement.remove()">Continue Shopping</button>
-            `;
-            
-            document.body.appendChild(notification);
-            
-            // Show notification
-            setTimeout(() => {
-                notification.classList.add('show');
-            }, 100);
-            
-            // Auto-hide after 8 seconds
-            setTimeout(() => {
-                notification.classList.remove('show');
-                setTimeout(() => {
-                    if (notification.parentElement) {
-                        notification.remove();
-                    }
-                }, 300);
-            }, 8000);
-        }
-
-        function showTimeoutNotification(service) {
-            // Remove existing timeout notification
-            const existing = document.querySelector('.timeout-notification');
-            if (existing) {
-                existing.remove();
-            }
-            
-            const serviceName = service === 'cart' ? 'Cart' : 'Users';
-            
-            // Create timeout notification
-            const notification = document.createElement('div');
-            notification.className = 'timeout-notification';
-            notification.innerHTML = `
-                <h3>⚠️ Service Timeout</h3>
-                <p>The ${serviceName} service did not respond within 10 seconds. The service may be unavailable or experiencing issues.</p>
-                <button onclick="this.parentElement.remove()">Close</button>
-            `;
-            
-            document.body.appendChild(notification);
-            
-            // Show notification
-            setTimeout(() => {
-                notification.classList.add('show');
-            }, 100);
-            
-            // Auto-hide after 15 seconds
-            setTimeout(() => {
-                notification.classList.remove('show');
-                setTimeout(() => {
-                    if (notification.parentElement) {
-                        notification.remove();
-                    }
-                }, 300);
-            }, 15000);
-        }
-    </script>
+    <script src="{{ url_for('assets', filename='js/store.js') }}"></script>
 </body>
 </html>
 '''
@@ -966,229 +656,8 @@ ADMIN_HTML = '''
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Store Administration - Metal Music Store</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #ffffff;
-            color: #1a1a1a;
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-
-        /* Header */
-        .header {
-            background: #1a1a1a;
-            color: white;
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            box-shadow: 0 2px 20px rgba(0,0,0,0.3);
-            margin-bottom: 40px;
-        }
-
-        .header-content {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            font-weight: 800;
-            margin-bottom: 10px;
-            color: #ffffff;
-            letter-spacing: -0.5px;
-        }
-
-        .header p {
-            font-size: 1.1rem;
-            opacity: 0.9;
-            font-weight: 500;
-        }
-
-        .admin-info {
-            background: rgba(255,255,255,0.1);
-            color: white;
-            padding: 10px 20px;
-            border-radius: 8px;
-            border: 1px solid rgba(255,255,255,0.3);
-            font-size: 0.9rem;
-            font-weight: 600;
-        }
-
-        .back-button {
-            background: rgba(255,255,255,0.1);
-            color: white;
-            border: 1px solid rgba(255,255,255,0.3);
-            padding: 12px 20px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            text-decoration: none;
-        }
-
-        .back-button:hover {
-            background: rgba(255,255,255,0.2);
-            transform: translateY(-1px);
-        }
-
-        .section-title {
-            color: #1a1a1a;
-            margin-bottom: 25px;
-            font-size: 2.5rem;
-            font-weight: 700;
-            letter-spacing: -0.5px;
-            position: relative;
-        }
-
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-
-        .stat-card {
-            background: white;
-            color: #1a1a1a;
-            padding: 25px;
-            border-radius: 12px;
-            text-align: center;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        }
-
-        .stat-number {
-            font-size: 3rem;
-            font-weight: 800;
-            margin-bottom: 10px;
-            color: #667eea;
-        }
-
-        .stat-label {
-            font-size: 1.1rem;
-            color: #666;
-            font-weight: 600;
-        }
-
-        .form-grid {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 30px;
-        }
-
-        .form-group {
-            margin-bottom: 20px;
-        }
-
-        .form-group label {
-            display: block;
-            color: #1a1a1a;
-            font-weight: 600;
-            margin-bottom: 8px;
-            font-size: 0.9rem;
-        }
-
-        .form-group input {
-            width: 100%;
-            padding: 14px 16px;
-            border: 2px solid #e1e5e9;
-            border-radius: 8px;
-            font-size: 1rem;
-            transition: border-color 0.3s ease;
-            background: white;
-            color: #1a1a1a;
-        }
-
-        .form-group input:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 14px 20px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 1rem;
-            font-weight: 600;
-            transition: all 0.3s ease;
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        .btn-danger {
-            background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%);
-            border-color: #c0392b;
-        }
-
-        .btn-danger:hover {
-            background: linear-gradient(135deg, #c0392b 0%, #e74c3c 100%);
-            box-shadow: 0 8px 25px rgba(231, 76, 60, 0.3);
-        }
-
-        .orders-list {
-            list-style: none;
-            max-height: 300px;
-            overflow-y: auto;
-        }
-
-        .order-item {
-            background: white;
-            padding: 15px;
-            border-radius: 8px;
-            margin-bottom: 10px;
-            border-left: 4px solid #667eea;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-        }
-
-        .empty-state {
-            text-align: center;
-            padding: 40px 20px;
-            color: #666;
-        }
-
-        .empty-state p {
-            font-size: 1.1rem;
-            margin-bottom: 10px;
-        }
-
-        @media (max-width: 768px) {
-            .form-grid {
-                grid-template-columns: 1fr;
-            }
-            
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .container {
-                padding: 0 16px;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/admin.css') }}">
 </head>
 <body>
     <div class="container">
@@ -1314,117 +783,37 @@ ADMIN_HTML = '''
         </div>
     </div>
 
-    <script>
-        // Initialize admin user info
-        function initAdminInfo() {
-            const adminUser = localStorage.getItem('adminUser');
-            if (adminUser) {
-                try {
-                    const user = JSON.parse(adminUser);
-                    document.getElementById('adminUsername').textContent = user.username || 'Admin';
-                } catch (e) {
-                    console.error('Error parsing admin user:', e);
-                }
-            }
-        }
-
-        // Check if user is still authenticated
-        function checkAuth() {
-            const token = localStorage.getItem('adminToken');
-            if (!token) {
-                window.location.href = '/';
-                return;
-            }
-
-            fetch('/api/verify', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ token: token })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (!data.valid || data.user.role !== 'admin') {
-                    localStorage.removeItem('adminToken');
-                    localStorage.removeItem('adminUser');
-                    window.location.href = '/';
-                }
-            })
-            .catch(error => {
-                console.error('Auth check failed:', error);
-                // Don't redirect immediately on network errors, just log
-                console.log('Network error during auth check, continuing...');
-            });
-        }
-
-        // Logout function
-        function logout() {
-            const token = localStorage.getItem('adminToken');
-            
-            // Call logout API
-            fetch('/admin/logout', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ token: token })
-            })
-            .then(response => response.json())
-            .then(data => {
-                // Clear local storage
-                localStorage.removeItem('adminToken');
-                localStorage.removeItem('adminUser');
-                // Redirect to home page
-                window.location.href = '/';
-            })
-            .catch(error => {
-                console.error('Logout error:', error);
-                // Clear local storage anyway and redirect
-                localStorage.removeItem('adminToken');
-                localStorage.removeItem('adminUser');
-                window.location.href = '/';
-            });
-        }
-
-        // Check auth every 10 minutes (less frequent to avoid constant redirects)
-        setInterval(checkAuth, 600000);
-        
-        // Initialize on page load
-        initAdminInfo();
-        checkAuth();
-        updateTimestamp();
-        
-        // Auto-refresh statistics every 30 seconds
-        setInterval(refreshStats, 30000);
-        
-        function refreshStats() {
-            // Refresh the page to get updated statistics
-            window.location.reload();
-        }
-        
-        function updateTimestamp() {
-            const now = new Date();
-            const timeString = now.toLocaleTimeString();
-            document.getElementById('updateTime').textContent = timeString;
-        }
-    </script>
+    <script src="{{ url_for('assets', filename='js/admin.js') }}"></script>
 </body>
 </html>
 '''
 
+# Shown in place of the cart when the cart service times out
+CART_TIMEOUT_HTML = INDEX_HTML.replace('</body>', '''
+        <div class="timeout-notification show">
+            <h3>⚠️ Service Timeout</h3>
+            <p>The cart service is not responding. Please try again later.</p>
+            <button onclick="this.parentElement.remove()">Close</button>
+        </div>
+        </body>''')
+
+# Compile every template once at startup; render_template then reuses the
+# compiled code from the Jinja cache instead of reparsing on each request.
+app.jinja_loader = DictLoader({
+    'index.html': INDEX_HTML,
+    'admin.html': ADMIN_HTML,
+    'cart_timeout.html': CART_TIMEOUT_HTML
+})
+for template_name in app.jinja_loader.list_templates():
+    app.jinja_env.get_template(template_name)
+
 # --- Routes ---
 @app.route('/')
 def index():
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute('SELECT * FROM albums ORDER BY created_at DESC')
-            albums = cur.fetchall()
-            cur.execute('''SELECT orders.id, albums.name, albums.artist, orders.quantity, albums.price 
-                          FROM orders JOIN albums ON orders.album_id = albums.id 
-                          ORDER BY orders.created_at DESC''')
-            orders = cur.fetchall()
-    return render_template_string(INDEX_HTML, albums=albums, orders=orders)
+    albums, next_cursor = get_first_page()
+    # Recent orders are loaded lazily from /api/orders/recent
+    return render_template('index.html', albums=albums, next_cursor=next_cursor, facets=get_facet_counts(),
+                           sorts=SORT_LABELS)
 
 @app.route('/add', methods=['POST'])
 def add_album():
@@ -1434,33 +823,95 @@ def add_album():
     cover_url = request.form.get('cover_url', '').strip()
     cover_file = request.files.get('cover_file')
     cover_path = ''
+    cover_variants = None
     if cover_file and cover_file.filename != '' and allowed_file(cover_file.filename):
-        filename = secure_filename(cover_file.filename)
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        # Ensure unique filename
-        base, ext = os.path.splitext(filename)
-        i = 1
-        while os.path.exists(save_path):
-            filename = f"{base}_{i}{ext}"
-            save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            i += 1
-        cover_file.save(save_path)
-        cover_path = url_for('static', filename=f'covers/{filename}')
+        # Covers are stored under their content hash, so identical uploads
+        # share one file and every cover URL is immutable.
+        extension = cover_file.filename.rsplit('.', 1)[1]
+        relative_path, created = covers.store_upload(cover_file.stream, app.config['UPLOAD_FOLDER'], extension)
+        if not created:
+            print(f"Cover upload is a duplicate of {relative_path}; reusing its file and variants")
+        save_path = os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
+        cover_path = url_for('static', filename=f'covers/{relative_path}')
+        try:
+            cover_variants = covers.generate_variants(save_path, cover_path.rsplit('/', 1)[0])
+        except Exception as e:
+            # Keep the original upload even if it can't be decoded for resizing
+            print(f"Could not generate cover variants for {relative_path}: {e}")
     elif cover_url:
         cover_path = cover_url
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute('INSERT INTO albums (name, artist, price, cover_url) VALUES (%s, %s, %s, %s)', 
-                       (name, artist, price, cover_path))
+            cur.execute('INSERT INTO albums (name, artist, price, cover_url, cover_variants) VALUES (%s, %s, %s, %s, %s)', 
+                       (name, artist, price, cover_path,
+                        psycopg2.extras.Json(cover_variants) if cover_variants else None))
         conn.commit()
+    catalog_cache.invalidate()
     return redirect(url_for('index'))
 
+# Bulk imports write their rejected records here, served back by name
+IMPORT_REPORT_FOLDER = os.environ.get('IMPORT_REPORT_FOLDER', os.path.join(tempfile.gettempdir(), 'album-import-reports'))
+os.makedirs(IMPORT_REPORT_FOLDER, exist_ok=True)
+
+@app.route('/api/albums/import', methods=['POST'])
+def import_albums():
+    """Bulk-import albums from a CSV or JSON Lines body (or ``file`` upload) via COPY.
+    
+    The body is read as a stream and imported in batches of
+    ``?batch_size=``, so any file size works in constant memory.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format')
+    if not fmt:
+        content_type = (upload.mimetype if upload else request.mimetype) or ''
+        if 'json' in content_type:
+            fmt = 'jsonl'
+        else:
+            fmt = catalog_import.detect_format(upload.filename if upload else None)
+    try:
+        batch_size = int(request.args.get('batch_size', catalog_import.IMPORT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({'error': 'batch_size must be an integer'}), 400
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be at least 1'}), 400
+    
+    report_name = f"import-{datetime.now():%Y%m%d-%H%M%S}-{os.urandom(4).hex()}.csv"
+    report_path = os.path.join(IMPORT_REPORT_FOLDER, report_name)
+    
+    def log_progress(stats):
+        print(f"Album import {report_name}: {stats['rows_read']} read, {stats['rows_imported']} imported, "
+              f"{stats['rows_rejected']} rejected in {stats['seconds']}s")
+    
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    try:
+        with get_db_connection() as conn, open(report_path, 'w', encoding='utf-8', newline='') as report:
+            stats = catalog_import.import_albums(conn, text_stream, fmt, batch_size, report, log_progress)
+    except (catalog_import.ImportFormatError, UnicodeDecodeError) as e:
+        os.remove(report_path)
+        return jsonify({'error': str(e)}), 400
+    finally:
+        # Batches committed before a failure are in the catalog as well
+        catalog_cache.invalidate()
+    
+    if stats['rows_rejected']:
+        stats['error_report'] = url_for('import_report', name=report_name)
+    else:
+        os.remove(report_path)
+    return jsonify(stats), 200
+
+@app.route('/api/albums/import/reports/<name>')
+def import_report(name):
+    """Download the rejected-records report of a bulk import"""
+    return send_from_directory(IMPORT_REPORT_FOLDER, name, mimetype='text/csv', as_attachment=True)
+
 @app.route('/delete/<int:album_id>', methods=['POST'])
 def delete_album(album_id):
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute('DELETE FROM albums WHERE id = %s', (album_id,))
         conn.commit()
+    catalog_cache.invalidate()
     return redirect(url_for('index'))
 
 @app.route('/api/album/<int:album_id>')
@@ -1474,19 +925,123 @@ def get_album(album_id):
     if not album:
         return jsonify({'error': 'Album not found'}), 404
     
+    return jsonify(album_to_dict(album)), 200
+
+@app.route('/api/albums')
+def list_albums():
+    """API endpoint to page through the catalog.
+    
+    Filters by ``?artist=`` and ``?price=<bucket>`` (both repeatable), orders
+    by ``?sort=`` and, with ``?facets=1``, adds per-value counts for both
+    facets. With ``?ids=1,2,3`` it instead looks up those albums in a single
+    query.
+    """
+    if 'ids' in request.args:
+        return get_albums_batch(request.args['ids'])
+    
+    try:
+        limit = int(request.args.get('limit', ALBUMS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, ALBUMS_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor') or None
+    sort = request.args.get('sort', 'newest')
+    if sort not in ALBUM_SORTS:
+        return jsonify({'error': f"sort must be one of: {', '.join(ALBUM_SORTS)}"}), 400
+    artists = tuple(sorted({a.strip() for a in request.args.getlist('artist') if a.strip()}))
+    price_buckets = tuple(sorted(set(request.args.getlist('price')) - {''}))
+    unknown = [key for key in price_buckets if key not in PRICE_BUCKETS_BY_KEY]
+    if unknown:
+        return jsonify({'error': f"Unknown price bucket: {', '.join(unknown)}"}), 400
+    
+    try:
+        if cursor is None:
+            # First pages are what the storefront renders, so share their snapshots
+            albums, next_cursor = get_first_page(limit, sort, artists, price_buckets)
+        else:
+            albums, next_cursor = fetch_album_page(cursor, limit, sort, artists, price_buckets)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    result = {
+        'albums': [album_to_dict(a) for a in albums],
+        'next_cursor': next_cursor
+    }
+    if request.args.get('facets') in ('1', 'true'):
+        result['facets'] = get_facet_counts(artists, price_buckets)
+    return jsonify(result), 200
+
+def get_albums_batch(ids_param):
+    """Multi-get albums, preserving the requested order and reporting missing ids"""
+    try:
+        requested = [int(part) for part in ids_param.split(',') if part.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+    if not requested:
+        return jsonify({'error': 'ids must not be empty'}), 400
+    
+    # Deduplicate while keeping the caller's order
+    album_ids = list(dict.fromkeys(requested))
+    if len(album_ids) > ALBUMS_MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {ALBUMS_MAX_BATCH_SIZE} ids can be requested at once'}), 400
+    
+    found = fetch_albums_by_ids(album_ids)
     return jsonify({
-        'id': album['id'],
-        'name': album['name'],
-        'artist': album['artist'],
-        'price': float(album['price']),
-        'cover_url': album['cover_url']
+        'albums': [album_to_dict(found[album_id]) for album_id in album_ids if album_id in found],
+        'missing': [album_id for album_id in album_ids if album_id not in found]
+    }), 200
+
+@app.route('/api/search')
+def search():
+    """API endpoint for ranked, typo-tolerant album search and autocomplete"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit = int(request.args.get('limit', SEARCH_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+    
+    albums = search_albums(query, limit)
+    return jsonify({
+        'query': query,
+        'albums': [dict(album_to_dict(a), score=round(float(a['score']), 4), match=a['match']) for a in albums]
+    }), 200
+
+@app.route('/api/orders/recent')
+def recent_orders():
+    """API endpoint for the bounded recent orders feed"""
+    try:
+        limit = int(request.args.get('limit', RECENT_ORDERS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, RECENT_ORDERS_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor') or None
+    
+    try:
+        if cursor is None and limit == RECENT_ORDERS_PAGE_SIZE:
+            orders, next_cursor = recent_orders_cache.get('first_page', fetch_recent_orders)
+        else:
+            orders, next_cursor = fetch_recent_orders(cursor, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'orders': [{
+            'id': o['id'],
+            'name': o['name'],
+            'artist': o['artist'],
+            'quantity': o['quantity'],
+            'price': float(o['price']),
+            'created_at': o['created_at'].isoformat()
+        } for o in orders],
+        'next_cursor': next_cursor
     }), 200
 
 @app.route('/add_to_cart', methods=['POST'])
 def add_to_cart():
     """Forward request to cart service with album details"""
-    import requests
-    
     try:
         # Get album details first
         album_id = request.form['album_id']
@@ -1513,8 +1068,8 @@ def add_to_cart():
             'session_id': session['cart_session_id']
         }
         
-        # Forward the request to cart service with album details (10 second timeout)
-        response = requests.post(f"{CART_SERVICE_URL}/add_to_cart", data=cart_data, timeout=10)
+        # Forward the request to cart service with album details
+        response = cart_client.post('/add_to_cart', data=cart_data)
         
         if response.status_code == 200:
             # Parse JSON response
@@ -1534,15 +1089,13 @@ def add_to_cart():
         else:
             return response.content, response.status_code
     except requests.Timeout:
-        return jsonify({'error': 'Cart service timeout after 10 seconds', 'timeout': True, 'service': 'cart'}), 504
+        return jsonify({'error': f'Cart service timeout after {cart_client.read_timeout:g} seconds', 'timeout': True, 'service': 'cart'}), 504
     except requests.RequestException as e:
         return jsonify({'error': f'Error connecting to cart service: {str(e)}', 'timeout': False, 'service': 'cart'}), 503
 
 @app.route('/cart')
 def view_cart():
     """Forward request to cart service"""
-    import requests
-    
     try:
         # Get session_id from our session
         session_id = session.get('cart_session_id')
@@ -1551,44 +1104,34 @@ def view_cart():
             session['cart_session_id'] = os.urandom(16).hex()
             session_id = session['cart_session_id']
         
-        # Pass session_id as query parameter (10 second timeout)
-        response = requests.get(f"{CART_SERVICE_URL}/?session_id={session_id}", timeout=10)
-        return response.content, response.status_code
+        # Pass session_id as query parameter
+        response = cart_client.get(f"/?session_id={session_id}", headers=relay_headers(), stream=True, hedge=True)
+        return relay(response)
     except requests.Timeout:
-        return render_template_string(INDEX_HTML.replace('</body>', '''
-        <div class="timeout-notification show">
-            <h3>⚠️ Service Timeout</h3>
-            <p>The cart service is not responding. Please try again later.</p>
-            <button onclick="this.parentElement.remove()">Close</button>
-        </div>
-        </body>''')), 504
+        return render_template('cart_timeout.html'), 504
     except requests.RequestException as e:
         return f"Error connecting to cart service: {str(e)}", 503
 
 @app.route('/checkout')
 def checkout():
     """Forward request to cart service checkout"""
-    import requests
-    
     try:
         # Get session_id from our session
         session_id = session.get('cart_session_id')
         if not session_id:
             return redirect(url_for('view_cart'))
         
-        # Pass session_id as query parameter (10 second timeout)
-        response = requests.get(f"{CART_SERVICE_URL}/checkout?session_id={session_id}", timeout=10)
-        return response.content, response.status_code
+        # Pass session_id as query parameter
+        response = cart_client.get(f"/checkout?session_id={session_id}", headers=relay_headers(), stream=True, hedge=True)
+        return relay(response)
     except requests.Timeout:
-        return f"Cart service timeout after 10 seconds", 504
+        return f"Cart service timeout after {cart_client.read_timeout:g} seconds", 504
     except requests.RequestException as e:
         return f"Error connecting to cart service: {str(e)}", 503
 
 @app.route('/process_payment', methods=['POST'])
 def process_payment():
     """Forward payment processing to cart service"""
-    import requests
-    
     try:
         # Get session_id from our session
         session_id = session.get('cart_session_id')
@@ -1599,11 +1142,17 @@ def process_payment():
         form_data = request.form.copy()
         form_data['session_id'] = session_id
         
-        response = requests.post(f"{CART_SERVICE_URL}/process_payment", data=form_data, allow_redirects=False, timeout=10)
+        response = cart_client.post('/process_payment', data=form_data, allow_redirects=False,
+                                    headers=relay_headers(), stream=True)
         
         # Handle redirects from cart service
         if response.status_code in [301, 302, 303, 307, 308]:
             redirect_url = response.headers.get('Location', '')
+            response.close()
+            path = urlsplit(redirect_url).path
+            if path.startswith('/payment/'):
+                # Payment queued; wait for it on our processing page
+                return redirect(url_for('payment_page', job_id=path[len('/payment/'):]), code=303)
             if redirect_url.startswith('/'):
                 # If it's a relative URL, redirect to our order_success route
                 return redirect(url_for('order_success'))
@@ -1611,15 +1160,52 @@ def process_payment():
                 # If it's an absolute URL, redirect to it
                 return redirect(redirect_url)
         
-        return response.content, response.status_code
+        return relay(response)
     except requests.RequestException as e:
         return f"Error connecting to cart service: {str(e)}", 503
 
+@app.route('/payment/<job_id>')
+def payment_page(job_id):
+    """Forward the payment processing page to cart service"""
+    try:
+        session_id = session.get('cart_session_id')
+        if not session_id:
+            return redirect(url_for('view_cart'))
+        
+        response = cart_client.get(f"/payment/{quote(job_id)}?session_id={session_id}", headers=relay_headers(), stream=True)
+        return relay(response)
+    except requests.Timeout:
+        return f"Cart service timeout after {cart_client.read_timeout:g} seconds", 504
+    except requests.RequestException as e:
+        return f"Error connecting to cart service: {str(e)}", 503
+
+@app.route('/api/payments/<job_id>')
+def payment_status(job_id):
+    """Forward payment status polls to cart service, long-polls included"""
+    session_id = session.get('cart_session_id')
+    if not session_id:
+        return jsonify({'error': 'Payment not found'}), 404
+    
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({'error': 'wait must be a number'}), 400
+    if not math.isfinite(wait):
+        return jsonify({'error': 'wait must be a finite number of seconds'}), 400
+    wait = min(max(wait, 0), PAYMENT_LONG_POLL_SECONDS)
+    try:
+        # The cart service may hold a long-poll open for `wait` seconds
+        response = cart_client.get(f"/api/payments/{quote(job_id)}", params={'session_id': session_id, 'wait': wait},
+                                   headers=relay_headers(), stream=True, long_poll=wait)
+        return relay(response)
+    except requests.Timeout:
+        return jsonify({'error': f'Cart service timeout after {cart_client.read_timeout:g} seconds', 'timeout': True, 'service': 'cart'}), 504
+    except requests.RequestException as e:
+        return jsonify({'error': f'Error connecting to cart service: {str(e)}', 'timeout': False, 'service': 'cart'}), 503
+
 @app.route('/remove_item', methods=['POST'])
 def remove_item():
     """Forward remove item request to cart service"""
-    import requests
-    
     try:
         # Get session_id from our session
         session_id = session.get('cart_session_id')
@@ -1631,18 +1217,16 @@ def remove_item():
             'item_id': request.form['item_id'],
             'session_id': session_id
         }
-        response = requests.post(f"{CART_SERVICE_URL}/remove_item", data=cart_data, timeout=10)
-        return response.content, response.status_code
+        response = cart_client.post('/remove_item', data=cart_data, headers=relay_headers(), stream=True)
+        return relay(response)
     except requests.Timeout:
-        return f"Cart service timeout after 10 seconds", 504
+        return f"Cart service timeout after {cart_client.read_timeout:g} seconds", 504
     except requests.RequestException as e:
         return f"Error connecting to cart service: {str(e)}", 503
 
 @app.route('/update_quantity', methods=['POST'])
 def update_quantity():
     """Forward update quantity request to cart service"""
-    import requests
-    
     try:
         # Get session_id from our session
         session_id = session.get('cart_session_id')
@@ -1655,113 +1239,92 @@ def update_quantity():
             'quantity': request.form['quantity'],
             'session_id': session_id
         }
-        response = requests.post(f"{CART_SERVICE_URL}/update_quantity", data=cart_data, timeout=10)
-        return response.content, response.status_code
+        response = cart_client.post('/update_quantity', data=cart_data, headers=relay_headers(), stream=True)
+        return relay(response)
     except requests.Timeout:
-        return f"Cart service timeout after 10 seconds", 504
+        return f"Cart service timeout after {cart_client.read_timeout:g} seconds", 504
     except requests.RequestException as e:
         return f"Error connecting to cart service: {str(e)}", 503
 
 @app.route('/order_success')
 def order_success():
     """Forward order success to cart service"""
-    import requests
-    
     try:
         # Get session_id from our session
         session_id = session.get('cart_session_id')
         if not session_id:
             return redirect(url_for('index'))
         
-        # Pass session_id as query parameter (10 second timeout)
-        response = requests.get(f"{CART_SERVICE_URL}/order_success?session_id={session_id}", timeout=10)
-        return response.content, response.status_code
+        # Pass session_id as query parameter
+        response = cart_client.get(f"/order_success?session_id={session_id}", headers=relay_headers(), stream=True)
+        return relay(response)
     except requests.Timeout:
-        return f"Cart service timeout after 10 seconds", 504
+        return f"Cart service timeout after {cart_client.read_timeout:g} seconds", 504
     except requests.RequestException as e:
         return f"Error connecting to cart service: {str(e)}", 503
 
 @app.route('/api/login', methods=['POST'])
 def login():
     """Forward login request to users service"""
-    import requests
-    
     try:
-        response = requests.post(f"{USERS_SERVICE_URL}/api/login", json=request.get_json(), timeout=10)
-        return response.content, response.status_code
+        response = users_client.post('/api/login', json=request.get_json(), headers=relay_headers(), stream=True)
+        return relay(response)
     except requests.Timeout:
-        return jsonify({'error': 'Users service timeout after 10 seconds', 'timeout': True, 'service': 'users'}), 504
+        return jsonify({'error': f'Users service timeout after {users_client.read_timeout:g} seconds', 'timeout': True, 'service': 'users'}), 504
     except requests.RequestException as e:
         return jsonify({'error': f'Users service unavailable: {str(e)}', 'timeout': False, 'service': 'users'}), 503
 
 @app.route('/api/logout', methods=['POST'])
 def logout():
     """Forward logout request to users service"""
-    import requests
-    
     try:
-        response = requests.post(f"{USERS_SERVICE_URL}/api/logout", json=request.get_json(), timeout=10)
-        return response.content, response.status_code
+        response = users_client.post('/api/logout', json=request.get_json(), headers=relay_headers(), stream=True)
+        return relay(response)
     except requests.Timeout:
-        return jsonify({'error': 'Users service timeout after 10 seconds', 'timeout': True, 'service': 'users'}), 504
+        return jsonify({'error': f'Users service timeout after {users_client.read_timeout:g} seconds', 'timeout': True, 'service': 'users'}), 504
     except requests.RequestException as e:
         return jsonify({'error': f'Users service unavailable: {str(e)}', 'timeout': False, 'service': 'users'}), 503
 
 @app.route('/api/verify', methods=['POST'])
 def verify_token():
     """Forward token verification to users service"""
-    import requests
-    
     try:
-        response = requests.post(f"{USERS_SERVICE_URL}/api/verify", json=request.get_json(), timeout=10)
-        return response.content, response.status_code
+        response = users_client.post('/api/verify', json=request.get_json(), headers=relay_headers(), stream=True)
+        return relay(response)
     except requests.Timeout:
-        return jsonify({'error': 'Users service timeout after 10 seconds', 'timeout': True, 'service': 'users'}), 504
+        return jsonify({'error': f'Users service timeout after {users_client.read_timeout:g} seconds', 'timeout': True, 'service': 'users'}), 504
     except requests.RequestException as e:
         return jsonify({'error': f'Users service unavailable: {str(e)}', 'timeout': False, 'service': 'users'}), 503
 
 @app.route('/admin')
 def admin_panel():
     """Admin panel - authentication handled by JavaScript"""
-    import requests
+    # Get albums from the catalog cache
+    albums = get_catalog()
     
-    # Get albums from main store database
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute('SELECT * FROM albums ORDER BY created_at DESC')
-            albums = cur.fetchall()
-    
-    # Get orders from order service
+    # Get orders with their items from order service in a single request
     orders = []
     total_revenue = 0
     try:
-        print(f"Fetching orders from: {ORDER_SERVICE_URL}/api/orders")
-        response = requests.get(f"{ORDER_SERVICE_URL}/api/orders", timeout=5)
+        print(f"Fetching orders from: {ORDER_SERVICE_URL}/api/orders/with-items")
+        response = order_client.get('/api/orders/with-items', params={'include_totals': 1})
         print(f"Order service response status: {response.status_code}")
         
         if response.status_code == 200:
-            orders_data = response.json()
-            print(f"Found {len(orders_data)} orders")
+            data = response.json()
+            print(f"Found {len(data['orders'])} orders")
             
             # Convert to the format expected by the template
-            for order in orders_data:
-                print(f"Processing order {order['id']}")
-                # Get order details with items
-                order_detail_response = requests.get(f"{ORDER_SERVICE_URL}/api/orders/{order['id']}", timeout=5)
-                if order_detail_response.status_code == 200:
-                    order_detail = order_detail_response.json()
-                    print(f"Order {order['id']} has {len(order_detail.get('items', []))} items")
-                    for item in order_detail.get('items', []):
-                        orders.append({
-                            'id': order['id'],
-                            'name': item['album_name'],
-                            'artist': item['artist'],
-                            'quantity': item['quantity'],
-                            'price': item['price']
-                        })
-                        total_revenue += item['price'] * item['quantity']
-                else:
-                    print(f"Failed to get details for order {order['id']}: {order_detail_response.status_code}")
+            for order in data['orders']:
+                for item in order['items']:
+                    orders.append({
+                        'id': order['id'],
+                        'name': item['album_name'],
+                        'artist': item['artist'],
+                        'quantity': item['quantity'],
+                        'price': item['price']
+                    })
+            total_revenue = data['totals']['revenue']
         else:
             print(f"Failed to fetch orders: {response.status_code}")
             print(f"Response content: {response.text}")
@@ -1778,7 +1341,7 @@ def admin_panel():
     print(f"Final stats - Orders: {len(orders)}, Revenue: ${total_revenue}")
     
     # Let JavaScript handle authentication
-    return render_template_string(ADMIN_HTML, albums=albums, orders=orders, total_revenue=total_revenue, ORDER_SERVICE_URL=ORDER_SERVICE_URL, user=None)
+    return render_template('admin.html', albums=albums, orders=orders, total_revenue=total_revenue, ORDER_SERVICE_URL=ORDER_SERVICE_URL, user=None)
 
 @app.route('/admin/logout', methods=['POST'])
 def admin_logout():
@@ -1791,10 +1354,8 @@ def admin_logout():
 @app.route('/test-order-service')
 def test_order_service():
     """Test endpoint to check order service connectivity"""
-    import requests
-    
     try:
-        response = requests.get(f"{ORDER_SERVICE_URL}/api/orders", timeout=5)
+        response = order_client.get('/api/orders')
         return jsonify({
             'status': 'success',
             'order_service_url': ORDER_SERVICE_URL,
@@ -1808,5 +1369,16 @@ def test_order_service():
             'error': str(e)
         })
 
+@app.route('/metrics')
+def metrics():
+    """Runtime statistics for scraping"""
+    return jsonify({
+        'db_pool': db_pool.stats(),
+        'catalog_cache': catalog_cache.stats(),
+        'recent_orders_cache': recent_orders_cache.stats(),
+        'http_clients': {client.name: client.stats() for client in (cart_client, users_client, order_client)},
+        'compression': compression.stats()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
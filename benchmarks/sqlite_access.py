@@ -0,0 +1,133 @@
+"""Benchmark requests/sec on the hot SQLite-backed endpoints.
+
+Compares the old data access, a fresh ``sqlite3.connect`` in rollback-journal
+mode for every ``with`` block, against the shared long-lived WAL connections
+of common/sqlite_db.py. Each scenario runs a mix of readers and one writer
+on concurrent threads through the Flask test client.
+
+    python benchmarks/sqlite_access.py [seconds-per-scenario] [threads]
+"""
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SERVICES = {
+    'cart': ('cart-service/app.py', 'CART_DB_PATH'),
+    'order': ('order-service/app.py', 'ORDER_DB_PATH'),
+    'users': ('users-service/app.py', 'USERS_DB_PATH'),
+}
+
+
+class PerRequestConnections:
+    """What the services did before: open, use and drop a connection per block"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def connection(self):
+        return sqlite3.connect(self.path)
+
+
+def load_service(name, directory, legacy):
+    path, env_var = SERVICES[name]
+    os.environ[env_var] = os.path.join(directory, f'{name}.db')
+    # Like `python <service>/app.py`, so service-local modules import
+    sys.path.insert(0, os.path.dirname(os.path.join(ROOT, path)))
+    if legacy:
+        # init_*_db() runs at import time, so swap the class before loading
+        import common.sqlite_db
+        original = common.sqlite_db.SQLiteDatabase
+        common.sqlite_db.SQLiteDatabase = PerRequestConnections
+    try:
+        spec = importlib.util.spec_from_file_location(f'{name}_app_{int(legacy)}', os.path.join(ROOT, path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        if legacy:
+            common.sqlite_db.SQLiteDatabase = original
+    return module
+
+
+def seed(name, module):
+    """Populate the service and return ``(read_request, write_request)`` callables"""
+    client = module.app.test_client()
+    if name == 'cart':
+        with module.db.connection() as conn:
+            conn.executemany('''
+                INSERT INTO cart_items (session_id, album_id, album_name, artist, price, quantity, cover_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(f'session-{s}', a, f'Album {a}', f'Artist {a}', 19.99 + a, 1, f'/static/covers/album_{a}.jpg')
+                  for s in range(200) for a in range(5)])
+            conn.commit()
+        return (lambda c, i: c.get(f'/?session_id=session-{i % 200}'),
+                lambda c, i: c.post('/update_quantity', data={'session_id': f'session-{i % 200}',
+                                                              'item_id': i % 1000 + 1, 'quantity': i % 5 + 1}))
+    if name == 'order':
+        order = {'session_id': 'bench', 'total': 43.98,
+                 'items': [{'album_id': 1, 'album_name': 'Album 1', 'artist': 'Artist 1', 'price': 21.99, 'quantity': 2}]}
+        for _ in range(200):
+            client.post('/api/orders', json=order)
+        return (lambda c, i: c.get(f'/api/orders/{i % 200 + 1}'),
+                lambda c, i: c.post('/api/orders', json=order))
+    token = client.post('/api/login', json={'username': 'admin', 'password': 'admin'}).get_json()['token']
+    return (lambda c, i: c.post('/api/verify', json={'token': token}),
+            lambda c, i: c.post('/api/login', json={'username': 'admin', 'password': 'admin'}))
+
+
+def run(module, read_request, write_request, seconds, threads):
+    counts = [0] * threads
+    errors = []
+    deadline = time.monotonic() + seconds
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        client = module.app.test_client()
+        request = write_request if index == 0 else read_request
+        barrier.wait()
+        i = index
+        while time.monotonic() < deadline:
+            response = request(client, i)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+            counts[index] += 1
+            i += threads
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    started = time.monotonic()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return sum(counts[1:]) / elapsed, counts[0] / elapsed, len(errors)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    print(f'{threads} threads (1 writer), {seconds:g}s per scenario')
+    print(f'{"service":<8} {"mode":<12} {"reads/s":>10} {"writes/s":>10} {"5xx":>6}')
+    for name in SERVICES:
+        results = {}
+        for mode, legacy in (('per-request', True), ('shared WAL', False)):
+            directory = tempfile.mkdtemp()
+            module = load_service(name, directory, legacy)
+            module.app.logger.disabled = True
+            read_request, write_request = seed(name, module)
+            results[mode] = run(module, read_request, write_request, seconds, threads)
+            reads, writes, errors = results[mode]
+            print(f'{name:<8} {mode:<12} {reads:>10.0f} {writes:>10.0f} {errors:>6}')
+        before, after = results['per-request'][0], results['shared WAL'][0]
+        print(f'{name:<8} {"speedup":<12} {after / before:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
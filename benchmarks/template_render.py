@@ -0,0 +1,95 @@
+"""Benchmark per-render time of the service templates.
+
+Compares recompiling each template on every request (the old
+render_template_string path) against rendering the precompiled template
+from the app's registry (render_template).
+
+    python benchmarks/template_render.py [iterations]
+"""
+import datetime
+import importlib.util
+import os
+import sys
+import tempfile
+import timeit
+
+from flask import render_template, render_template_string
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load_service(name, path):
+    # Like `python <service>/app.py`, so service-local modules import
+    sys.path.insert(0, os.path.dirname(os.path.join(ROOT, path)))
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def sample_contexts():
+    now = datetime.datetime.now()
+    albums = [{
+        'id': i,
+        'name': f'Album {i}',
+        'artist': f'Artist {i}',
+        'price': 19.99 + i,
+        'cover_url': f'/static/covers/album_{i}.jpg',
+        'created_at': now
+    } for i in range(24)]
+    admin_orders = [{'id': i, 'name': f'Album {i}', 'artist': f'Artist {i}', 'quantity': 2, 'price': 21.99}
+                    for i in range(20)]
+    cart_items = [(i, 'session', i, f'Album {i}', f'Artist {i}', 21.99, 1, f'/static/covers/album_{i}.jpg', str(now))
+                  for i in range(5)]
+    orders = [(i, f'ORD-{i}', 43.98, 'confirmed', str(now), 2) for i in range(20)]
+    order = (1, 'ORD-1', 43.98, 'confirmed', str(now))
+    items = [(i, f'Album {i}', f'Artist {i}', 21.99, 2) for i in range(2)]
+    return {
+        'index.html': dict(albums=albums, next_cursor='cursor',
+                           facets={'artist': [{'value': f'Artist {i}', 'count': 1} for i in range(24)],
+                                   'price': [{'value': 'under-20', 'label': 'Under $20', 'count': 24}]},
+                           sorts={'newest': 'Newest', 'price_asc': 'Price: low to high'}),
+        'admin.html': dict(albums=albums, orders=admin_orders, total_revenue=879.6,
+                           ORDER_SERVICE_URL='http://order-service:5001', user=None),
+        'cart_timeout.html': {},
+        'cart.html': dict(cart_items=cart_items, total=109.95),
+        'checkout.html': dict(cart_items=cart_items, total=109.95),
+        'success.html': {},
+        'payment.html': dict(job={'id': 'job', 'status': 'processing', 'error': None},
+                             status_url='/api/payments/job', poll_wait=5),
+        'orders_dashboard.html': dict(orders=orders),
+        'order_detail.html': dict(order=order, items=items),
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault('CART_DB_PATH', os.path.join(tmp, 'cart.db'))
+    os.environ.setdefault('ORDER_DB_PATH', os.path.join(tmp, 'orders.db'))
+
+    services = [
+        ('store', load_service('store_app', 'app.py')),
+        ('cart', load_service('cart_app', 'cart-service/app.py')),
+        ('order', load_service('order_app', 'order-service/app.py')),
+    ]
+    contexts = sample_contexts()
+
+    print(f'{"service":<8} {"template":<24} {"recompile ms":>13} {"precompiled ms":>15} {"speedup":>8}')
+    for service, module in services:
+        app = module.app
+        loader = app.jinja_loader
+        for name in loader.list_templates():
+            source = loader.get_source(app.jinja_env, name)[0]
+            context = contexts[name]
+            with app.test_request_context():
+                before = timeit.timeit(lambda: render_template_string(source, **context), number=iterations)
+                after = timeit.timeit(lambda: render_template(name, **context), number=iterations)
+            before_ms = before / iterations * 1000
+            after_ms = after / iterations * 1000
+            print(f'{service:<8} {name:<24} {before_ms:>13.3f} {after_ms:>15.3f} {before_ms / after_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,63 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session, jsonify
-import sqlite3
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+import atexit
 import os
+import random
+import signal
+import sys
+import time
 import requests
 import json
+import math
+from jinja2 import DictLoader
+
+# Modules shared between services live in ../common in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.compression import Compression
+from common.sqlite_db import SQLiteDatabase
+from common.static_assets import shared_assets
+from cart_store import CartRepository, CartStore, CartSweeper
+from payments import DECLINED, FAILED, SUCCEEDED, PaymentProcessor, PaymentQueueFull
 
 app = Flask(__name__)
 app.secret_key = 'cart-secret-key-here'
+# gzip/brotli for HTML and JSON responses (see common/compression.py)
+compression = Compression(app)
+# CSS/JS bundles shared with the store pages, served at /assets
+assets = shared_assets(app)
 
 # Configuration
 CART_DB_PATH = os.environ.get('CART_DB_PATH', 'cart.db')
+# Long-lived WAL connections with busy retries (see common/sqlite_db.py)
+db = SQLiteDatabase(CART_DB_PATH)
 ORDER_SERVICE_URL = os.environ.get('ORDER_SERVICE_URL', 'http://localhost:5001')
 STORE_SERVICE_URL = os.environ.get('STORE_SERVICE_URL', 'http://localhost:5000')
+# 'sqlite' reads and writes every cart change through to the database;
+# 'memory' serves carts from an in-process LRU and writes them back in batches
+CART_STORE_MODE = os.environ.get('CART_STORE_MODE', 'sqlite')
+CART_STORE_MAX_SESSIONS = int(os.environ.get('CART_STORE_MAX_SESSIONS', '10000'))
+CART_STORE_FLUSH_INTERVAL = float(os.environ.get('CART_STORE_FLUSH_INTERVAL', '1.0'))
+CART_STORE_FLUSH_THRESHOLD = int(os.environ.get('CART_STORE_FLUSH_THRESHOLD', '500'))
+# Carts untouched for this long are purged by a background sweeper; 0 keeps them forever
+CART_TTL_SECONDS = int(os.environ.get('CART_TTL_SECONDS', str(7 * 24 * 3600)))
+CART_ACTIVITY_RESOLUTION = int(os.environ.get('CART_ACTIVITY_RESOLUTION', '60'))
+CART_SWEEP_INTERVAL = float(os.environ.get('CART_SWEEP_INTERVAL', '300'))
+CART_SWEEP_BATCH_SIZE = int(os.environ.get('CART_SWEEP_BATCH_SIZE', '500'))
+CART_SWEEP_BATCH_PAUSE = float(os.environ.get('CART_SWEEP_BATCH_PAUSE', '0.05'))
+CART_VACUUM_STEP_PAGES = int(os.environ.get('CART_VACUUM_STEP_PAGES', '500'))
+# Payments are authorized by a worker pool; checkout only queues them
+PAYMENT_WORKERS = int(os.environ.get('PAYMENT_WORKERS', '4'))
+PAYMENT_MAX_PENDING = int(os.environ.get('PAYMENT_MAX_PENDING', '1000'))
+PAYMENT_JOB_TTL = float(os.environ.get('PAYMENT_JOB_TTL', '600'))
+PAYMENT_LONG_POLL_SECONDS = float(os.environ.get('PAYMENT_LONG_POLL_SECONDS', '5'))
 
 def init_cart_db():
-    with sqlite3.connect(CART_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
+        if c.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            # Lets the sweeper hand purged pages back to the OS a few at a
+            # time; an existing file only switches over after one VACUUM
+            c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            c.execute('VACUUM')
         c.execute('''CREATE TABLE IF NOT EXISTS cart_items (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             session_id TEXT NOT NULL,
@@ -26,10 +69,96 @@ def init_cart_db():
             cover_url TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )''')
+        migrate_unique_cart_items(c)
+        # Cart pages list one session's items newest first
+        c.execute('CREATE INDEX IF NOT EXISTS idx_cart_items_session_created_at ON cart_items(session_id, created_at)')
+        migrate_cart_sessions(c)
         conn.commit()
 
+def migrate_cart_sessions(c):
+    """Track each cart's last activity, so abandoned carts can expire"""
+    exists = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cart_sessions'").fetchone()
+    c.execute('''CREATE TABLE IF NOT EXISTS cart_sessions (
+        session_id TEXT PRIMARY KEY,
+        last_activity TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_cart_sessions_last_activity ON cart_sessions(last_activity)')
+    if not exists:
+        # Carts from before activity tracking count from their newest item
+        c.execute('''
+            INSERT OR IGNORE INTO cart_sessions (session_id, last_activity)
+            SELECT session_id, MAX(created_at) FROM cart_items GROUP BY session_id
+        ''')
+
+def migrate_unique_cart_items(c):
+    """Merge duplicate (session_id, album_id) rows and make the pair unique"""
+    # Take the write lock before looking, so replicas starting together
+    # can't both merge the same duplicates
+    c.execute('BEGIN IMMEDIATE')
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_cart_items_session_album'").fetchone():
+        return
+    # Concurrent adds used to race and insert the same album twice; keep the
+    # oldest row of each pair with the quantities summed.
+    c.execute('''CREATE TEMP TABLE cart_item_duplicates AS
+        SELECT session_id, album_id, MIN(id) AS keep_id, SUM(quantity) AS quantity
+        FROM cart_items
+        GROUP BY session_id, album_id
+        HAVING COUNT(*) > 1''')
+    c.execute('''
+        UPDATE cart_items
+        SET quantity = (SELECT d.quantity FROM cart_item_duplicates d WHERE d.keep_id = cart_items.id)
+        WHERE id IN (SELECT keep_id FROM cart_item_duplicates)
+    ''')
+    merged = c.execute('''
+        DELETE FROM cart_items
+        WHERE (session_id, album_id) IN (SELECT session_id, album_id FROM cart_item_duplicates)
+          AND id NOT IN (SELECT keep_id FROM cart_item_duplicates)
+    ''').rowcount
+    c.execute('DROP TABLE cart_item_duplicates')
+    c.execute('CREATE UNIQUE INDEX idx_cart_items_session_album ON cart_items(session_id, album_id)')
+    if merged:
+        print(f"Merged {merged} duplicate cart rows")
+
 init_cart_db()
 
+carts = CartRepository(db, activity_resolution=CART_ACTIVITY_RESOLUTION)
+if CART_STORE_MODE == 'memory':
+    carts = CartStore(carts, max_sessions=CART_STORE_MAX_SESSIONS, flush_interval=CART_STORE_FLUSH_INTERVAL,
+                      flush_threshold=CART_STORE_FLUSH_THRESHOLD)
+    # Write pending carts back before the process exits
+    atexit.register(carts.close)
+
+sweeper = CartSweeper(db, CART_TTL_SECONDS, interval=CART_SWEEP_INTERVAL, batch_size=CART_SWEEP_BATCH_SIZE,
+                      batch_pause=CART_SWEEP_BATCH_PAUSE, vacuum_step_pages=CART_VACUUM_STEP_PAGES,
+                      on_purge=getattr(carts, 'forget', None))
+if CART_TTL_SECONDS > 0:
+    sweeper.start()
+
+def authorize_payment(job):
+    """Simulated gateway authorization followed by the order; runs on a payment worker"""
+    # Simulate processing delay
+    time.sleep(2)
+    
+    # Simulate random payment failures (3% chance)
+    if random.random() < 0.03:
+        return DECLINED, "Payment declined. Please check your card details and try again.", None
+    
+    try:
+        response = requests.post(f"{ORDER_SERVICE_URL}/api/orders", json=job.payload, timeout=10)
+    except requests.RequestException:
+        return FAILED, "Order service unavailable. Please try again later.", None
+    if response.status_code != 201:
+        return FAILED, "Order processing failed. Please try again.", None
+    
+    # Clear cart after successful order
+    carts.clear(job.session_id)
+    return SUCCEEDED, None, {'order_number': response.json().get('order_number')}
+
+payments = PaymentProcessor(authorize_payment, workers=PAYMENT_WORKERS, max_pending=PAYMENT_MAX_PENDING,
+                            job_ttl=PAYMENT_JOB_TTL)
+# Registered after the cart store, so queued payments finish before it flushes
+atexit.register(payments.shutdown)
+
 @app.route('/')
 def cart():
     # Get session_id from query parameter or session
@@ -42,17 +171,11 @@ def cart():
         # Use the provided session_id and store it in our session
         session['session_id'] = session_id
     
-    with sqlite3.connect(CART_DB_PATH) as conn:
-        c = conn.cursor()
-        cart_items = c.execute('''
-            SELECT * FROM cart_items 
-            WHERE session_id = ? 
-            ORDER BY created_at DESC
-        ''', (session_id,)).fetchall()
+    cart_items = carts.items(session_id)
     
     total = sum(item[6] * item[5] for item in cart_items)  # quantity * price
     
-    return render_template_string(CART_HTML, cart_items=cart_items, total=total)
+    return render_template('cart.html', cart_items=cart_items, total=total)
 
 @app.route('/add_to_cart', methods=['POST'])
 def add_to_cart():
@@ -93,32 +216,8 @@ def add_to_cart():
             print(f"DEBUG: Request failed: {e}")
             return jsonify({'error': f'Store service unavailable: {str(e)}'}), 503
     
-    # Add to cart
-    with sqlite3.connect(CART_DB_PATH) as conn:
-        c = conn.cursor()
-        
-        # Check if item already in cart
-        existing = c.execute('''
-            SELECT id, quantity FROM cart_items 
-            WHERE session_id = ? AND album_id = ?
-        ''', (session_id, album_id)).fetchone()
-        
-        if existing:
-            # Update quantity
-            new_quantity = existing[1] + quantity
-            c.execute('''
-                UPDATE cart_items 
-                SET quantity = ? 
-                WHERE id = ?
-            ''', (new_quantity, existing[0]))
-        else:
-            # Add new item
-            c.execute('''
-                INSERT INTO cart_items (session_id, album_id, album_name, artist, price, quantity, cover_url)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (session_id, album_id, album_name, artist, price, quantity, cover_url))
-        
-        conn.commit()
+    # Add to cart, or add to the quantity already there
+    carts.add(session_id, album_id, album_name, artist, price, quantity, cover_url)
     
     # Return JSON response with session_id for store service to use
     return jsonify({
@@ -145,18 +244,10 @@ def update_quantity():
     
     if quantity <= 0:
         # Remove item
-        with sqlite3.connect(CART_DB_PATH) as conn:
-            c = conn.cursor()
-            c.execute('DELETE FROM cart_items WHERE id = ? AND session_id = ?', 
-                     (item_id, session_id))
-            conn.commit()
+        carts.remove(session_id, item_id)
     else:
         # Update quantity
-        with sqlite3.connect(CART_DB_PATH) as conn:
-            c = conn.cursor()
-            c.execute('UPDATE cart_items SET quantity = ? WHERE id = ? AND session_id = ?', 
-                     (quantity, item_id, session_id))
-            conn.commit()
+        carts.set_quantity(session_id, item_id, quantity)
     
     return redirect(url_for('cart'))
 
@@ -174,11 +265,7 @@ def remove_item():
     
     item_id = int(request.form['item_id'])
     
-    with sqlite3.connect(CART_DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute('DELETE FROM cart_items WHERE id = ? AND session_id = ?', 
-                 (item_id, session_id))
-        conn.commit()
+    carts.remove(session_id, item_id)
     
     return redirect(url_for('cart'))
 
@@ -194,20 +281,14 @@ def checkout():
         # Use the provided session_id and store it in our session
         session['session_id'] = session_id
     
-    with sqlite3.connect(CART_DB_PATH) as conn:
-        c = conn.cursor()
-        cart_items = c.execute('''
-            SELECT * FROM cart_items 
-            WHERE session_id = ? 
-            ORDER BY created_at DESC
-        ''', (session_id,)).fetchall()
+    cart_items = carts.items(session_id)
     
     if not cart_items:
         return redirect(url_for('cart'))
     
     total = sum(item[6] * item[5] for item in cart_items)
     
-    return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total)
+    return render_template('checkout.html', cart_items=cart_items, total=total)
 
 @app.route('/process_payment', methods=['POST'])
 def process_payment():
@@ -222,12 +303,7 @@ def process_payment():
         session['session_id'] = session_id
     
     # Get cart items
-    with sqlite3.connect(CART_DB_PATH) as conn:
-        c = conn.cursor()
-        cart_items = c.execute('''
-            SELECT * FROM cart_items 
-            WHERE session_id = ?
-        ''', (session_id,)).fetchall()
+    cart_items = carts.items(session_id)
     
     if not cart_items:
         return redirect(url_for('cart'))
@@ -245,7 +321,7 @@ def process_payment():
     for field in required_fields:
         if not request.form.get(field, '').strip():
             total = sum(item[6] * item[5] for item in cart_items)
-            return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
+            return render_template('checkout.html', cart_items=cart_items, total=total, 
                                         error=f"Please fill in all required fields. Missing: {field.replace('_', ' ').title()}")
     
     # Validate payment details
@@ -257,17 +333,17 @@ def process_payment():
     # Enhanced validation
     if len(card_number) < 13 or len(card_number) > 19:
         total = sum(item[6] * item[5] for item in cart_items)
-        return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
+        return render_template('checkout.html', cart_items=cart_items, total=total, 
                                     error="Invalid card number. Please enter a valid credit card number.")
     
     if len(cvv) < 3 or len(cvv) > 4:
         total = sum(item[6] * item[5] for item in cart_items)
-        return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
+        return render_template('checkout.html', cart_items=cart_items, total=total, 
                                     error="Invalid CVV. Please enter a valid 3 or 4 digit CVV.")
     
     if len(cardholder_name) < 2:
         total = sum(item[6] * item[5] for item in cart_items)
-        return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
+        return render_template('checkout.html', cart_items=cart_items, total=total, 
                                     error="Please enter the cardholder name as it appears on the card.")
     
     # Validate email format
@@ -276,20 +352,9 @@ def process_payment():
     email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     if not re.match(email_pattern, email):
         total = sum(item[6] * item[5] for item in cart_items)
-        return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
+        return render_template('checkout.html', cart_items=cart_items, total=total, 
                                     error="Please enter a valid email address.")
     
-    # Simulate processing delay
-    import time
-    time.sleep(2)
-    
-    # Simulate random payment failures (3% chance)
-    import random
-    if random.random() < 0.03:
-        total = sum(item[6] * item[5] for item in cart_items)
-        return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
-                                    error="Payment declined. Please check your card details and try again.")
-    
     # Prepare order data with shipping and billing information
     order_data = {
         'session_id': session_id,
@@ -330,27 +395,61 @@ def process_payment():
         }
     }
     
+    # Authorization happens on a payment worker; the buyer waits on the
+    # processing page instead of holding this request thread
     try:
-        response = requests.post(f"{ORDER_SERVICE_URL}/api/orders", json=order_data)
-        if response.status_code == 201:
-            # Clear cart after successful order
-            with sqlite3.connect(CART_DB_PATH) as conn:
-                c = conn.cursor()
-                c.execute('DELETE FROM cart_items WHERE session_id = ?', (session_id,))
-                conn.commit()
-            
-            # Store order details in session for success page
-            session['order_details'] = order_data
-            
-            return redirect(url_for('order_success'))
-        else:
-            total = sum(item[6] * item[5] for item in cart_items)
-            return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
-                                        error="Order processing failed. Please try again.")
-    except requests.RequestException:
+        job = payments.submit(session_id, order_data)
+    except PaymentQueueFull:
         total = sum(item[6] * item[5] for item in cart_items)
-        return render_template_string(CHECKOUT_HTML, cart_items=cart_items, total=total, 
-                                    error="Order service unavailable. Please try again later.")
+        return render_template('checkout.html', cart_items=cart_items, total=total, 
+                                    error="We're processing a lot of payments right now. Please try again in a moment."), 503
+    
+    if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+        return jsonify({
+            'payment_id': job.id,
+            'status': job.status,
+            'status_url': url_for('payment_status', job_id=job.id)
+        }), 202
+    return redirect(url_for('payment_page', job_id=job.id), code=303)
+
+def find_payment(job_id):
+    """The payment job with this id, if it belongs to the caller's cart session"""
+    job = payments.get(job_id)
+    session_id = request.args.get('session_id') or session.get('session_id')
+    if job is None or job.session_id != session_id:
+        return None
+    return job
+
+@app.route('/payment/<job_id>')
+def payment_page(job_id):
+    """Processing page shown while a payment is authorized"""
+    job = find_payment(job_id)
+    if job is None:
+        return render_template('payment.html', job=None), 404
+    return render_template('payment.html', job=job, status_url=url_for('payment_status', job_id=job.id),
+                           poll_wait=PAYMENT_LONG_POLL_SECONDS)
+
+@app.route('/api/payments/<job_id>')
+def payment_status(job_id):
+    """Payment job status; with ?wait=N, long-polls up to N seconds for the result"""
+    job = find_payment(job_id)
+    if job is None:
+        return jsonify({'error': 'Payment not found'}), 404
+    
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({'error': 'wait must be a number'}), 400
+    if not math.isfinite(wait):
+        return jsonify({'error': 'wait must be a finite number of seconds'}), 400
+    wait = min(max(wait, 0), PAYMENT_LONG_POLL_SECONDS)
+    if wait:
+        payments.wait(job, wait)
+    
+    result = job.to_dict()
+    if job.status == SUCCEEDED:
+        result['redirect_url'] = url_for('order_success')
+    return jsonify(result)
 
 @app.route('/order_success')
 def order_success():
@@ -361,7 +460,7 @@ def order_success():
         session['session_id'] = session_id
     
     # We don't need order_details for the simplified success page
-    return render_template_string(SUCCESS_HTML)
+    return render_template('success.html')
 
 # Cart HTML Template
 CART_HTML = '''
@@ -372,206 +471,8 @@ CART_HTML = '''
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Shopping Cart - Metal Music Store</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #ffffff;
-            color: #1a1a1a;
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-
-        /* Header */
-        .header {
-            background: #1a1a1a;
-            color: white;
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            box-shadow: 0 2px 20px rgba(0,0,0,0.3);
-            margin-bottom: 40px;
-        }
-
-        .header-content {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            font-weight: 800;
-            margin-bottom: 10px;
-            color: #ffffff;
-            letter-spacing: -0.5px;
-        }
-
-        .cart-card {
-            background: white;
-            border-radius: 16px;
-            padding: 30px;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-            border: 1px solid #e1e5e9;
-        }
-
-        .cart-item {
-            display: grid;
-            grid-template-columns: 80px 2fr 1fr 1fr auto;
-            gap: 20px;
-            align-items: center;
-            padding: 20px;
-            border-bottom: 1px solid #e1e5e9;
-            transition: all 0.3s ease;
-        }
-
-        .cart-item:last-child {
-            border-bottom: none;
-        }
-
-        .item-cover {
-            width: 60px;
-            height: 60px;
-            object-fit: cover;
-            border-radius: 8px;
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        }
-
-        .item-info h3 {
-            color: #1a1a1a;
-            margin-bottom: 5px;
-            font-weight: 700;
-        }
-
-        .item-info p {
-            color: #666;
-            font-size: 0.9rem;
-            font-weight: 500;
-        }
-
-        .item-price {
-            font-weight: 800;
-            color: #667eea;
-        }
-
-        .quantity-controls {
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-
-        .quantity-controls input {
-            width: 60px;
-            padding: 10px;
-            border: 2px solid #e1e5e9;
-            border-radius: 8px;
-            text-align: center;
-            background: white;
-            color: #1a1a1a;
-            font-weight: 500;
-            transition: all 0.3s ease;
-        }
-
-        .quantity-controls input:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 12px 20px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            font-weight: 600;
-            transition: all 0.3s ease;
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        .btn-danger {
-            background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%);
-        }
-
-        .btn-danger:hover {
-            box-shadow: 0 8px 25px rgba(231, 76, 60, 0.3);
-        }
-
-        .cart-total {
-            background: white;
-            border-radius: 12px;
-            padding: 25px;
-            margin-top: 30px;
-            text-align: right;
-            border-left: 4px solid #667eea;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        }
-
-        .cart-total h3 {
-            color: #1a1a1a;
-            margin-bottom: 15px;
-            font-weight: 700;
-        }
-
-        .total-amount {
-            font-size: 2.5rem;
-            font-weight: 800;
-            color: #667eea;
-        }
-
-        .cart-actions {
-            display: flex;
-            justify-content: space-between;
-            margin-top: 20px;
-        }
-
-        .empty-cart {
-            text-align: center;
-            padding: 60px 20px;
-            color: #666;
-        }
-
-        .empty-cart p {
-            font-size: 1.1rem;
-            margin-bottom: 20px;
-            font-weight: 500;
-        }
-
-        @media (max-width: 768px) {
-            .cart-item {
-                grid-template-columns: 1fr;
-                gap: 10px;
-                text-align: center;
-            }
-            
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .container {
-                padding: 0 16px;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/cart.css') }}">
 </head>
 <body>
     <div class="container">
@@ -649,246 +550,8 @@ CHECKOUT_HTML = '''
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Checkout - Metal Music Store</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #ffffff;
-            color: #1a1a1a;
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-
-        /* Header */
-        .header {
-            background: #1a1a1a;
-            color: white;
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            box-shadow: 0 2px 20px rgba(0,0,0,0.3);
-            margin-bottom: 40px;
-            text-align: center;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            font-weight: 800;
-            margin-bottom: 10px;
-            color: #ffffff;
-            letter-spacing: -0.5px;
-        }
-
-        .checkout-card {
-            background: white;
-            border-radius: 16px;
-            padding: 40px;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-            border: 1px solid #e1e5e9;
-        }
-
-        .order-summary {
-            background: white;
-            border-radius: 12px;
-            padding: 25px;
-            margin-bottom: 30px;
-            border-left: 4px solid #667eea;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        }
-
-        .order-summary h3 {
-            color: #1a1a1a;
-            margin-bottom: 15px;
-            font-size: 1.3rem;
-            font-weight: 700;
-        }
-
-        .order-item {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 10px;
-            padding: 10px 0;
-            border-bottom: 1px solid #e1e5e9;
-            color: #1a1a1a;
-        }
-
-        .order-item:last-child {
-            border-bottom: none;
-        }
-
-        .order-total {
-            border-top: 2px solid #e1e5e9;
-            padding-top: 15px;
-            margin-top: 15px;
-            font-size: 1.2rem;
-            font-weight: bold;
-            color: #667eea;
-            display: flex;
-            justify-content: space-between;
-        }
-
-        .form-section {
-            margin-bottom: 40px;
-        }
-
-        .form-section h3 {
-            color: #1a1a1a;
-            margin-bottom: 20px;
-            font-size: 1.3rem;
-            border-bottom: 2px solid #e1e5e9;
-            padding-bottom: 10px;
-            font-weight: 700;
-        }
-
-        .form-row {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 20px;
-        }
-
-        .form-group {
-            margin-bottom: 20px;
-        }
-
-        .form-group.full-width {
-            grid-column: 1 / -1;
-        }
-
-        .form-group label {
-            display: block;
-            margin-bottom: 8px;
-            font-weight: 600;
-            color: #1a1a1a;
-            font-size: 0.9rem;
-        }
-
-        .form-group input, .form-group select {
-            width: 100%;
-            padding: 14px 16px;
-            border: 2px solid #e1e5e9;
-            border-radius: 8px;
-            font-size: 1rem;
-            transition: border-color 0.3s ease;
-            background: white;
-            color: #1a1a1a;
-        }
-
-        .form-group input:focus, .form-group select:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-
-        .card-row {
-            display: grid;
-            grid-template-columns: 2fr 1fr 1fr;
-            gap: 15px;
-        }
-
-        .checkbox-group {
-            display: flex;
-            align-items: center;
-            gap: 10px;
-            margin-bottom: 20px;
-        }
-
-        .checkbox-group input[type="checkbox"] {
-            width: auto;
-        }
-
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 15px 30px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 1rem;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            width: 100%;
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        .btn:disabled {
-            opacity: 0.6;
-            cursor: not-allowed;
-            transform: none;
-        }
-
-        .error-message {
-            background: #f8d7da;
-            color: #721c24;
-            padding: 12px;
-            border-radius: 8px;
-            margin-bottom: 20px;
-            border: 1px solid #f5c6cb;
-        }
-
-        .back-link {
-            text-align: center;
-            margin-top: 20px;
-        }
-
-        .back-link a {
-            color: #667eea;
-            text-decoration: none;
-            font-weight: 600;
-        }
-
-        .back-link a:hover {
-            text-decoration: underline;
-        }
-
-        .loading {
-            display: none;
-            text-align: center;
-            margin: 20px 0;
-        }
-
-        .spinner {
-            border: 3px solid #f3f3f3;
-            border-top: 3px solid #667eea;
-            border-radius: 50%;
-            width: 30px;
-            height: 30px;
-            animation: spin 1s linear infinite;
-            margin: 0 auto 10px;
-        }
-
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
-
-        @media (max-width: 768px) {
-            .form-row, .card-row {
-                grid-template-columns: 1fr;
-            }
-            
-            .header h1 {
-                font-size: 2rem;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/checkout.css') }}">
 </head>
 <body>
     <div class="container">
@@ -1079,97 +742,7 @@ CHECKOUT_HTML = '''
         </div>
     </div>
 
-    <script>
-        // Format card number with spaces
-        document.getElementById('card_number').addEventListener('input', function(e) {
-            let value = e.target.value.replace(/\\s/g, '').replace(/[^0-9]/gi, '');
-            let formattedValue = value.replace(/(.{4})/g, '$1 ').trim();
-            e.target.value = formattedValue;
-        });
-
-        // Format expiry date
-        document.getElementById('expiry').addEventListener('input', function(e) {
-            let value = e.target.value.replace(/[^0-9]/g, '');
-            if (value.length >= 2) {
-                value = value.substring(0, 2) + '/' + value.substring(2, 4);
-            }
-            e.target.value = value;
-        });
-
-        // Only allow numbers for CVV
-        document.getElementById('cvv').addEventListener('input', function(e) {
-            e.target.value = e.target.value.replace(/[^0-9]/g, '');
-        });
-
-        // Same as shipping address functionality
-        document.getElementById('same_as_shipping').addEventListener('change', function(e) {
-            const billingFields = document.getElementById('billing-fields');
-            if (e.target.checked) {
-                billingFields.style.display = 'none';
-                // Copy shipping values to billing
-                document.getElementById('billing_first_name').value = document.getElementById('shipping_first_name').value;
-                document.getElementById('billing_last_name').value = document.getElementById('shipping_last_name').value;
-                document.getElementById('billing_address').value = document.getElementById('shipping_address').value;
-                document.getElementById('billing_city').value = document.getElementById('shipping_city').value;
-                document.getElementById('billing_state').value = document.getElementById('shipping_state').value;
-                document.getElementById('billing_zip').value = document.getElementById('shipping_zip').value;
-                document.getElementById('billing_country').value = document.getElementById('shipping_country').value;
-            } else {
-                billingFields.style.display = 'block';
-            }
-        });
-
-        // Form submission with loading state
-        document.getElementById('checkout-form').addEventListener('submit', function(e) {
-            const submitBtn = document.getElementById('submit-btn');
-            const btnText = document.getElementById('btn-text');
-            const loading = document.getElementById('loading');
-            
-            submitBtn.disabled = true;
-            btnText.textContent = 'Processing...';
-            loading.style.display = 'block';
-        });
-
-        // Auto-fill with sample data for testing
-        function fillSampleData() {
-            const sampleData = {
-                'email': 'test@example.com',
-                'phone': '(555) 123-4567',
-                'shipping_first_name': 'John',
-                'shipping_last_name': 'Doe',
-                'shipping_address': '123 Main Street',
-                'shipping_city': 'New York',
-                'shipping_state': 'NY',
-                'shipping_zip': '10001',
-                'shipping_country': 'US',
-                'billing_first_name': 'John',
-                'billing_last_name': 'Doe',
-                'billing_address': '123 Main Street',
-                'billing_city': 'New York',
-                'billing_state': 'NY',
-                'billing_zip': '10001',
-                'billing_country': 'US',
-                'cardholder_name': 'John Doe',
-                'card_number': '4111 1111 1111 1111',
-                'expiry': '12/25',
-                'cvv': '123'
-            };
-            
-            for (const [key, value] of Object.entries(sampleData)) {
-                const element = document.getElementById(key);
-                if (element) {
-                    element.value = value;
-                }
-            }
-        }
-
-        // Add sample data button for testing (remove in production)
-        const sampleBtn = document.createElement('button');
-        sampleBtn.textContent = 'Fill Sample Data (Testing)';
-        sampleBtn.style.cssText = 'position: fixed; top: 20px; right: 20px; background: #28a745; color: white; border: none; padding: 10px; border-radius: 5px; cursor: pointer; z-index: 1000;';
-        sampleBtn.onclick = fillSampleData;
-        document.body.appendChild(sampleBtn);
-    </script>
+    <script src="{{ url_for('assets', filename='js/checkout.js') }}"></script>
 </body>
 </html>
 '''
@@ -1182,135 +755,8 @@ SUCCESS_HTML = '''
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Order Successful - Metal Music Store</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #ffffff;
-            color: #1a1a1a;
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-
-        /* Header */
-        .header {
-            background: #1a1a1a;
-            color: white;
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            box-shadow: 0 2px 20px rgba(0,0,0,0.3);
-            margin-bottom: 40px;
-            text-align: center;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            font-weight: 800;
-            margin-bottom: 10px;
-            color: #ffffff;
-            letter-spacing: -0.5px;
-        }
-
-        .success-card {
-            background: white;
-            border-radius: 16px;
-            padding: 40px;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-            border: 1px solid #e1e5e9;
-            text-align: center;
-        }
-
-        .success-icon {
-            font-size: 4rem;
-            margin-bottom: 20px;
-            color: #667eea;
-        }
-
-        .success-title {
-            color: #1a1a1a;
-            font-size: 2rem;
-            margin-bottom: 15px;
-            font-weight: 700;
-        }
-
-        .success-message {
-            color: #666;
-            font-size: 1.1rem;
-            margin-bottom: 30px;
-            line-height: 1.6;
-        }
-
-        .order-summary {
-            background: white;
-            border-radius: 12px;
-            padding: 25px;
-            margin: 20px 0;
-            border-left: 4px solid #28a745;
-            text-align: left;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        }
-
-        .order-summary h4 {
-            color: #28a745;
-            margin-bottom: 15px;
-            font-size: 1.3rem;
-            text-align: center;
-            font-weight: 700;
-        }
-
-        .order-info {
-            color: #1a1a1a;
-            font-size: 1rem;
-            line-height: 1.6;
-            text-align: center;
-        }
-
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 15px 30px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 1rem;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            text-decoration: none;
-            display: inline-block;
-            margin: 10px;
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        .btn-secondary {
-            background: #f8f9fa;
-            color: #666;
-            border: 1px solid #e1e5e9;
-        }
-
-        .btn-secondary:hover {
-            background: #e9ecef;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/success.css') }}">
 </head>
 <body>
     <div class="container">
@@ -1352,5 +798,82 @@ SUCCESS_HTML = '''
 </html>
 '''
 
+PAYMENT_HTML = '''
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Processing Payment - Metal Music Store</title>
+    {% if job and job.status not in ('succeeded', 'declined', 'failed') %}
+    <noscript><meta http-equiv="refresh" content="2"></noscript>
+    {% endif %}
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/success.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/payment.css') }}">
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🤘 Checkout</h1>
+            <p>Hang tight while we confirm your payment</p>
+        </div>
+
+        {% if job %}
+        <div class="success-card" id="payment-status" data-status="{{ job.status }}"
+             data-status-url="{{ status_url }}" data-poll-wait="{{ poll_wait }}">
+            <div id="payment-pending" class="payment-state"{% if job.status in ('succeeded', 'declined', 'failed') %} hidden{% endif %}>
+                <div class="spinner payment-spinner"></div>
+                <h1 class="success-title">Processing Payment...</h1>
+                <p class="success-message">Authorizing your card. This usually takes a couple of seconds.</p>
+            </div>
+            <div id="payment-succeeded" class="payment-state"{% if job.status != 'succeeded' %} hidden{% endif %}>
+                <div class="success-icon">✅</div>
+                <h1 class="success-title">Payment Confirmed</h1>
+                <p class="success-message"><a href="/order_success">Continue to your order confirmation</a></p>
+            </div>
+            <div id="payment-failed" class="payment-state"{% if job.status not in ('declined', 'failed') %} hidden{% endif %}>
+                <div class="error-message" id="payment-error">{{ job.error or '' }}</div>
+                <a href="/checkout" class="btn">Back to Checkout</a>
+            </div>
+        </div>
+        {% else %}
+        <div class="success-card">
+            <h1 class="success-title">Payment Not Found</h1>
+            <p class="success-message">This payment has expired or belongs to another session.</p>
+            <a href="/checkout" class="btn">Back to Checkout</a>
+        </div>
+        {% endif %}
+    </div>
+    <script src="{{ url_for('assets', filename='js/payment.js') }}"></script>
+</body>
+</html>
+'''
+
+# Compile every template once at startup; render_template then reuses the
+# compiled code from the Jinja cache instead of reparsing on each request.
+app.jinja_loader = DictLoader({
+    'cart.html': CART_HTML,
+    'checkout.html': CHECKOUT_HTML,
+    'success.html': SUCCESS_HTML,
+    'payment.html': PAYMENT_HTML
+})
+for template_name in app.jinja_loader.list_templates():
+    app.jinja_env.get_template(template_name)
+
+@app.route('/metrics')
+def metrics():
+    """Runtime statistics for scraping"""
+    return jsonify({
+        'compression': compression.stats(),
+        'sqlite': db.stats(),
+        'cart_store': carts.stats(),
+        'cart_sweeper': sweeper.stats(),
+        'payments': payments.stats()
+    })
+
 if __name__ == '__main__':
+    # Exit through atexit on `docker stop` too, so the cart store is flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(host='0.0.0.0', port=5002, debug=True) 
\ No newline at end of file
@@ -0,0 +1,508 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Rows are cart_items tuples:
+# (id, session_id, album_id, album_name, artist, price, quantity, cover_url, created_at)
+ID, SESSION_ID, ALBUM_ID, ALBUM_NAME, ARTIST, PRICE, QUANTITY, COVER_URL, CREATED_AT = range(9)
+
+TOUCH_SQL = '''
+    INSERT INTO cart_sessions (session_id, last_activity) VALUES (?, ?)
+    ON CONFLICT (session_id) DO UPDATE SET last_activity = MAX(last_activity, excluded.last_activity)
+'''
+
+
+def utc_timestamp(seconds=None):
+    """Format a Unix time like SQLite's CURRENT_TIMESTAMP"""
+    return datetime.fromtimestamp(time.time() if seconds is None else seconds, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class CartRepository:
+    """Cart items read and written straight through to SQLite.
+
+    Every change records the session's last activity in cart_sessions for
+    the sweeper. Viewing a cart records it too, at most once per
+    ``activity_resolution`` seconds, so page views don't each take the
+    write lock.
+    """
+
+    def __init__(self, db, activity_resolution=60):
+        self.db = db
+        self.activity_resolution = activity_resolution
+
+    def items(self, session_id):
+        """A session's cart rows, newest first"""
+        with self.db.connection() as conn:
+            rows = conn.execute('''
+                SELECT * FROM cart_items
+                WHERE session_id = ?
+                ORDER BY created_at DESC
+            ''', (session_id,)).fetchall()
+            if rows:
+                recent = conn.execute('''
+                    SELECT 1 FROM cart_sessions WHERE session_id = ? AND last_activity >= ?
+                ''', (session_id, utc_timestamp(time.time() - self.activity_resolution))).fetchone()
+                if not recent:
+                    conn.execute(TOUCH_SQL, (session_id, utc_timestamp()))
+        return rows
+
+    def add(self, session_id, album_id, album_name, artist, price, quantity, cover_url):
+        # One statement, so concurrent adds of the same album can't create
+        # duplicate rows
+        with self.db.connection() as conn:
+            conn.execute('''
+                INSERT INTO cart_items (session_id, album_id, album_name, artist, price, quantity, cover_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (session_id, album_id) DO UPDATE SET quantity = quantity + excluded.quantity
+            ''', (session_id, album_id, album_name, artist, price, quantity, cover_url))
+            conn.execute(TOUCH_SQL, (session_id, utc_timestamp()))
+
+    def set_quantity(self, session_id, item_id, quantity):
+        with self.db.connection() as conn:
+            conn.execute('UPDATE cart_items SET quantity = ? WHERE id = ? AND session_id = ?',
+                         (quantity, item_id, session_id))
+            conn.execute(TOUCH_SQL, (session_id, utc_timestamp()))
+
+    def remove(self, session_id, item_id):
+        with self.db.connection() as conn:
+            conn.execute('DELETE FROM cart_items WHERE id = ? AND session_id = ?', (item_id, session_id))
+            conn.execute(TOUCH_SQL, (session_id, utc_timestamp()))
+
+    def clear(self, session_id):
+        with self.db.connection() as conn:
+            conn.execute('DELETE FROM cart_items WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM cart_sessions WHERE session_id = ?', (session_id,))
+
+    def replace_sessions(self, carts):
+        """Overwrite the stored rows and last activity of every
+        ``(session_id, rows, last_activity)`` cart in one transaction"""
+        with self.db.connection() as conn:
+            conn.executemany('DELETE FROM cart_items WHERE session_id = ?', [(cart[0],) for cart in carts])
+            conn.executemany('INSERT INTO cart_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             [row for _, rows, _ in carts for row in rows])
+            conn.executemany(TOUCH_SQL, [(session_id, utc_timestamp(last_activity))
+                                         for session_id, rows, last_activity in carts if rows])
+            conn.executemany('DELETE FROM cart_sessions WHERE session_id = ?',
+                             [(session_id,) for session_id, rows, _ in carts if not rows])
+
+    def max_id(self):
+        """Highest item id ever handed out, including deleted rows"""
+        with self.db.connection() as conn:
+            row = conn.execute('''
+                SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'cart_items'), 0),
+                           COALESCE((SELECT MAX(id) FROM cart_items), 0))
+            ''').fetchone()
+        return row[0]
+
+    def stats(self):
+        return {'mode': 'sqlite'}
+
+
+class _Cart:
+    __slots__ = ('lock', 'rows', 'loaded', 'users', 'version', 'last_activity', 'activity_written')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}          # album_id -> row as a list
+        self.loaded = False
+        self.users = 0          # requests holding this cart; never evicted while > 0
+        self.version = 0        # bumped on every change, so a flush knows if it is stale
+        self.last_activity = self.activity_written = time.time()
+
+    def snapshot(self):
+        return sorted((tuple(row) for row in self.rows.values()),
+                      key=lambda row: (row[CREATED_AT], row[ID]), reverse=True)
+
+
+class CartStore:
+    """In-process, write-behind cache of session carts in front of SQLite.
+
+    Up to ``max_sessions`` carts are kept in LRU order, each behind its own
+    lock, so reads and changes never touch the disk once a cart is loaded.
+    A cart that isn't cached is reloaded from SQLite on first use. Changed
+    carts are written back in batches by a background thread every
+    ``flush_interval`` seconds, sooner once ``flush_threshold`` carts are
+    waiting, and on ``close()``. A changed cart stays pending, and is served
+    from memory, until it has been written even if the LRU evicts it.
+
+    Item ids are handed out in-process, so only one process may write a
+    cart database through a CartStore at a time.
+    """
+
+    def __init__(self, repository, max_sessions=10000, flush_interval=1.0, flush_threshold=500):
+        self.repository = repository
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._lock = threading.Lock()
+        self._carts = OrderedDict()     # session_id -> _Cart, least recently used first
+        self._dirty = {}                # session_id -> _Cart waiting to be written
+        self._next_id = repository.max_id() + 1
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._flushes = 0
+        self._sessions_written = 0
+        self._rows_written = 0
+        self._flush_errors = 0
+
+        self._flusher = threading.Thread(target=self._run, name='cart-store-flush', daemon=True)
+        self._flusher.start()
+
+    # --- cache internals ---
+
+    def _acquire(self, session_id):
+        with self._lock:
+            cart = self._carts.get(session_id)
+            if cart is not None:
+                self._carts.move_to_end(session_id)
+                self._hits += 1
+            else:
+                # An evicted cart that hasn't been written yet is still the
+                # newest copy; SQLite would be stale.
+                cart = self._dirty.get(session_id)
+                if cart is not None:
+                    self._hits += 1
+                else:
+                    cart = _Cart()
+                    self._misses += 1
+                self._carts[session_id] = cart
+                self._evict()
+            cart.users += 1
+        cart.lock.acquire()
+        if not cart.loaded:
+            try:
+                cart.rows = {row[ALBUM_ID]: list(row) for row in self.repository.items(session_id)}
+            except BaseException:
+                self._release(cart)
+                raise
+            cart.loaded = True
+        return cart
+
+    def _release(self, cart):
+        cart.lock.release()
+        with self._lock:
+            cart.users -= 1
+
+    def _evict(self):
+        excess = len(self._carts) - self.max_sessions
+        if excess <= 0:
+            return
+        victims = []
+        for session_id, cart in self._carts.items():
+            if cart.users == 0:
+                victims.append(session_id)
+                if len(victims) == excess:
+                    break
+        for session_id in victims:
+            del self._carts[session_id]
+            self._evictions += 1
+
+    def _changed(self, session_id, cart):
+        with self._lock:
+            cart.version += 1
+            self._dirty[session_id] = cart
+            if len(self._dirty) >= self.flush_threshold:
+                self._wake.set()
+
+    def _allocate_id(self):
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+        return item_id
+
+    # --- cart operations, same interface as CartRepository ---
+
+    def items(self, session_id):
+        cart = self._acquire(session_id)
+        try:
+            cart.last_activity = time.time()
+            # Views only reach SQLite as an activity timestamp for the
+            # sweeper, and no more often than the repository would write it
+            if cart.rows and cart.last_activity - cart.activity_written >= self.repository.activity_resolution:
+                self._changed(session_id, cart)
+            return cart.snapshot()
+        finally:
+            self._release(cart)
+
+    def add(self, session_id, album_id, album_name, artist, price, quantity, cover_url):
+        cart = self._acquire(session_id)
+        try:
+            row = cart.rows.get(album_id)
+            if row is not None:
+                row[QUANTITY] += quantity
+            else:
+                created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                cart.rows[album_id] = [self._allocate_id(), session_id, album_id, album_name, artist,
+                                       price, quantity, cover_url, created_at]
+            cart.last_activity = time.time()
+            self._changed(session_id, cart)
+        finally:
+            self._release(cart)
+
+    def set_quantity(self, session_id, item_id, quantity):
+        cart = self._acquire(session_id)
+        try:
+            for row in cart.rows.values():
+                if row[ID] == item_id:
+                    row[QUANTITY] = quantity
+                    cart.last_activity = time.time()
+                    self._changed(session_id, cart)
+                    break
+        finally:
+            self._release(cart)
+
+    def remove(self, session_id, item_id):
+        cart = self._acquire(session_id)
+        try:
+            for album_id, row in list(cart.rows.items()):
+                if row[ID] == item_id:
+                    del cart.rows[album_id]
+                    cart.last_activity = time.time()
+                    self._changed(session_id, cart)
+                    break
+        finally:
+            self._release(cart)
+
+    def clear(self, session_id):
+        cart = self._acquire(session_id)
+        try:
+            if cart.rows:
+                cart.rows = {}
+                self._changed(session_id, cart)
+        finally:
+            self._release(cart)
+
+    # --- write-behind ---
+
+    def flush(self):
+        """Write every changed cart to SQLite; returns the number of carts written"""
+        with self._flush_lock:
+            with self._lock:
+                self._wake.clear()
+                pending = list(self._dirty.items())
+            written = 0
+            for start in range(0, len(pending), self.flush_threshold):
+                batch = []
+                for session_id, cart in pending[start:start + self.flush_threshold]:
+                    with cart.lock:
+                        batch.append((session_id, cart, cart.version, cart.snapshot(), cart.last_activity))
+                try:
+                    self.repository.replace_sessions([(session_id, rows, last_activity)
+                                                      for session_id, _, _, rows, last_activity in batch])
+                except Exception as e:
+                    # Leave the carts pending; the next flush tries again
+                    with self._lock:
+                        self._flush_errors += 1
+                    print(f"Cart store flush failed: {e}")
+                    break
+                with self._lock:
+                    for session_id, cart, version, rows, last_activity in batch:
+                        cart.activity_written = last_activity
+                        # Changed again while being written: keep it pending
+                        if cart.version == version and self._dirty.get(session_id) is cart:
+                            del self._dirty[session_id]
+                        self._rows_written += len(rows)
+                    self._flushes += 1
+                    self._sessions_written += len(batch)
+                written += len(batch)
+            return written
+
+    def forget(self, session_ids):
+        """Drop cached copies of carts the sweeper purged from SQLite.
+
+        A cart changed or viewed since is kept: that activity un-expires it
+        and its next write puts it back.
+        """
+        with self._lock:
+            for session_id in session_ids:
+                cart = self._carts.get(session_id)
+                if cart is not None and cart.users == 0 and session_id not in self._dirty:
+                    del self._carts[session_id]
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        """Stop the background writer and flush what is still pending"""
+        self._stopping.set()
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'mode': 'memory',
+                'max_sessions': self.max_sessions,
+                'sessions_cached': len(self._carts),
+                'sessions_pending_write': len(self._dirty),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'flush_interval_seconds': self.flush_interval,
+                'flush_threshold': self.flush_threshold,
+                'flushes': self._flushes,
+                'sessions_written': self._sessions_written,
+                'rows_written': self._rows_written,
+                'flush_errors': self._flush_errors,
+            }
+
+
+class CartSweeper:
+    """Background purge of carts idle for longer than ``ttl`` seconds.
+
+    Every ``interval`` seconds expired sessions are deleted, items and all,
+    ``batch_size`` sessions per short write transaction with ``batch_pause``
+    seconds between transactions, so an add_to_cart never waits behind more
+    than one small batch. The freed pages are then returned to the OS with
+    ``PRAGMA incremental_vacuum``, ``vacuum_step_pages`` pages at a time.
+    ``on_purge`` is called with each batch of purged session ids.
+    """
+
+    def __init__(self, db, ttl, interval=300.0, batch_size=500, batch_pause=0.05, vacuum_step_pages=500,
+                 on_purge=None):
+        self.db = db
+        self.ttl = ttl
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_step_pages = vacuum_step_pages
+        self.on_purge = on_purge
+
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._runs = 0
+        self._sessions_purged = 0
+        self._rows_purged = 0
+        self._batches = 0
+        self._pages_vacuumed = 0
+        self._incremental_vacuum = None
+        self._errors = 0
+        self._last_run_at = None
+        self._last_run_seconds = 0.0
+        self._last_run_rows_purged = 0
+        self._max_batch_seconds = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='cart-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                print(f"Cart sweep failed: {e}")
+
+    def _purge_batch(self, cutoff):
+        started = time.monotonic()
+        with self.db.connection() as conn:
+            # Select and delete under one write lock, so a cart touched in
+            # between can't be purged
+            conn.execute('BEGIN IMMEDIATE')
+            session_ids = [row[0] for row in conn.execute('''
+                SELECT session_id FROM cart_sessions
+                WHERE last_activity < ?
+                ORDER BY last_activity
+                LIMIT ?
+            ''', (cutoff, self.batch_size))]
+            rows = 0
+            for session_id in session_ids:
+                rows += conn.execute('DELETE FROM cart_items WHERE session_id = ?', (session_id,)).rowcount
+            conn.executemany('DELETE FROM cart_sessions WHERE session_id = ?', [(sid,) for sid in session_ids])
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._batches += 1
+            self._max_batch_seconds = max(self._max_batch_seconds, elapsed)
+        return session_ids, rows
+
+    def sweep(self):
+        """Purge every expired cart now; returns ``(sessions, rows)`` purged"""
+        started = time.monotonic()
+        cutoff = utc_timestamp(time.time() - self.ttl)
+        sessions = rows = 0
+        while not self._stopping.is_set():
+            session_ids, purged = self._purge_batch(cutoff)
+            sessions += len(session_ids)
+            rows += purged
+            with self._lock:
+                self._sessions_purged += len(session_ids)
+                self._rows_purged += purged
+            if session_ids and self.on_purge is not None:
+                self.on_purge(session_ids)
+            if len(session_ids) < self.batch_size:
+                break
+            time.sleep(self.batch_pause)
+
+        pages = 0
+        incremental = False
+        if sessions:
+            # incremental_vacuum does nothing unless the file really is in
+            # incremental mode, which needs the VACUUM at startup to have run
+            with self.db.connection() as conn:
+                incremental = conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+            with self._lock:
+                self._incremental_vacuum = incremental
+            if not incremental:
+                print("Cart sweep: database is not in incremental auto_vacuum mode; purged pages stay allocated")
+        while sessions and incremental and not self._stopping.is_set():
+            with self.db.connection() as conn:
+                free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if not free:
+                    break
+                step = min(free, self.vacuum_step_pages)
+                # incremental_vacuum frees one page per step; executescript
+                # steps it to completion where execute() stops after one
+                conn.executescript(f'PRAGMA incremental_vacuum({int(step)})')
+                freed = free - conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if freed <= 0:
+                break
+            pages += freed
+            time.sleep(self.batch_pause)
+
+        with self._lock:
+            self._runs += 1
+            self._pages_vacuumed += pages
+            self._last_run_at = utc_timestamp()
+            self._last_run_seconds = round(time.monotonic() - started, 3)
+            self._last_run_rows_purged = rows
+        return sessions, rows
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.ttl > 0,
+                'ttl_seconds': self.ttl,
+                'interval_seconds': self.interval,
+                'batch_size': self.batch_size,
+                'runs': self._runs,
+                'batches': self._batches,
+                'sessions_purged': self._sessions_purged,
+                'rows_purged': self._rows_purged,
+                'pages_vacuumed': self._pages_vacuumed,
+                'incremental_vacuum': self._incremental_vacuum,
+                'errors': self._errors,
+                'last_run_at': self._last_run_at,
+                'last_run_seconds': self._last_run_seconds,
+                'last_run_rows_purged': self._last_run_rows_purged,
+                'max_batch_lock_seconds': round(self._max_batch_seconds, 6),
+            }
@@ -0,0 +1,155 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states; the last three are final
+QUEUED = 'queued'
+PROCESSING = 'processing'
+SUCCEEDED = 'succeeded'
+DECLINED = 'declined'
+FAILED = 'failed'
+FINAL_STATES = (SUCCEEDED, DECLINED, FAILED)
+
+
+class PaymentQueueFull(Exception):
+    """Raised when a payment is submitted while every queue slot is taken"""
+
+
+class PaymentJob:
+    def __init__(self, session_id, payload):
+        self.id = secrets.token_urlsafe(16)
+        self.session_id = session_id
+        self.payload = payload
+        self.status = QUEUED
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'done': self.status in FINAL_STATES,
+            'error': self.error,
+            'result': self.result,
+        }
+
+
+class PaymentProcessor:
+    """Runs payment authorizations on a fixed pool of worker threads.
+
+    ``submit`` queues a job and returns at once; ``authorize(job)`` then runs
+    on one of ``workers`` threads and returns ``(status, error, result)``.
+    At most ``max_pending`` jobs may be queued or running, beyond that
+    ``submit`` raises PaymentQueueFull. A session has at most one unfinished
+    job, so a double-submitted form doesn't pay twice. Finished jobs are
+    kept for ``job_ttl`` seconds for their status to be read.
+    """
+
+    def __init__(self, authorize, workers=4, max_pending=1000, job_ttl=600.0):
+        self.authorize = authorize
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payment')
+        self._cond = threading.Condition()
+        self._jobs = OrderedDict()      # id -> PaymentJob, oldest first
+        self._active = {}               # session_id -> unfinished PaymentJob
+        self._pending = 0
+        self._processing = 0
+
+        self._submitted = 0
+        self._rejected = 0
+        self._finished = {SUCCEEDED: 0, DECLINED: 0, FAILED: 0}
+        self._queue_wait_total = 0.0
+        self._run_total = 0.0
+
+    def _prune(self, now):
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if job.finished_at is None or now - job.finished_at < self.job_ttl:
+                break
+            del self._jobs[job.id]
+
+    def submit(self, session_id, payload):
+        """Queue a payment and return its job; reuses the session's unfinished job"""
+        with self._cond:
+            self._prune(time.time())
+            job = self._active.get(session_id)
+            if job is not None:
+                return job
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PaymentQueueFull(f'{self._pending} payments already waiting')
+            job = PaymentJob(session_id, payload)
+            self._jobs[job.id] = job
+            self._active[session_id] = job
+            self._pending += 1
+            self._submitted += 1
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        started = time.time()
+        with self._cond:
+            job.status = PROCESSING
+            self._processing += 1
+            self._queue_wait_total += started - job.created_at
+        try:
+            status, error, result = self.authorize(job)
+        except Exception as e:
+            print(f"Payment {job.id} failed: {e}")
+            status, error, result = FAILED, 'Payment processing failed. Please try again.', None
+        with self._cond:
+            job.status, job.error, job.result = status, error, result
+            job.finished_at = time.time()
+            job.payload = None
+            self._pending -= 1
+            self._processing -= 1
+            self._finished[status] += 1
+            self._run_total += job.finished_at - started
+            if self._active.get(job.session_id) is job:
+                del self._active[job.session_id]
+            self._cond.notify_all()
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def wait(self, job, timeout):
+        """Block up to ``timeout`` seconds for a job to finish; returns the job"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while job.status not in FINAL_STATES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return job
+
+    def shutdown(self):
+        """Finish every queued payment, then stop the workers"""
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._cond:
+            finished = sum(self._finished.values())
+            started = finished + self._processing
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'queued': self._pending - self._processing,
+                'processing': self._processing,
+                'submitted': self._submitted,
+                'rejected_queue_full': self._rejected,
+                'succeeded': self._finished[SUCCEEDED],
+                'declined': self._finished[DECLINED],
+                'failed': self._finished[FAILED],
+                'queue_wait_seconds_avg': round(self._queue_wait_total / started, 6) if started else 0.0,
+                'run_seconds_avg': round(self._run_total / finished, 6) if finished else 0.0,
+                'jobs_retained': len(self._jobs),
+            }
@@ -0,0 +1,91 @@
+import threading
+import time
+
+
+class CatalogCache:
+    """In-process read-through cache for catalog queries.
+
+    Every entry is stamped with the cache version that was current when its
+    loader started. ``invalidate()`` bumps the version, so a snapshot that
+    was being loaded while an album was added or deleted is never served.
+    The TTL is only a fallback for writes made by other replicas, which
+    cannot reach this process's ``invalidate()``. With ``max_entries`` set,
+    the oldest entries are evicted first, which bounds keys derived from
+    request parameters.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._entries = {}   # key -> (version, loaded_at, value)
+        self._version = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def _fresh(self, entry, now):
+        version, loaded_at, _ = entry
+        if version != self._version:
+            return False
+        return not self.ttl or now - loaded_at < self.ttl
+
+    def get(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry, time.monotonic()):
+                self._hits += 1
+                return entry[2]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread per key goes to the database; the rest wait and
+        # pick up its result.
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and self._fresh(entry, time.monotonic()):
+                    self._hits += 1
+                    return entry[2]
+                self._misses += 1
+                version = self._version
+            value = loader()
+            with self._lock:
+                if version == self._version:
+                    self._entries.pop(key, None)
+                    self._entries[key] = (version, time.monotonic(), value)
+                    while self.max_entries and len(self._entries) > self.max_entries:
+                        oldest = next(iter(self._entries))
+                        del self._entries[oldest]
+                        self._load_locks.pop(oldest, None)
+                        self._evictions += 1
+            return value
+
+    def invalidate(self):
+        """Drop every snapshot; call after any write to the albums table"""
+        with self._lock:
+            self._version += 1
+            self._invalidations += 1
+            self._entries.clear()
+            self._load_locks.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self._invalidations,
+                'evictions': self._evictions,
+            }
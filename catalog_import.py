@@ -0,0 +1,210 @@
+"""Bulk-load albums from CSV or JSON Lines through PostgreSQL COPY.
+
+Records are read one at a time, validated in batches, and every batch of
+valid rows is streamed to ``COPY albums ... FROM STDIN`` and committed, so
+memory use depends on the batch size, never on the file size. Rejected
+records are written to an error report with their line number and reason.
+
+    python catalog_import.py catalog.csv [--format csv|jsonl] [--batch-size N] [--errors report.csv]
+
+CSV files need a header row with ``name``, ``artist`` and ``price`` columns
+and may add ``cover_url``; JSON Lines records use the same keys.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+import psycopg2
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '5000'))
+FORMATS = ('csv', 'jsonl')
+EXTENSION_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+COPY_SQL = 'COPY albums (name, artist, price, cover_url) FROM STDIN WITH (FORMAT csv)'
+
+MAX_TEXT_LENGTH = 255        # albums.name and albums.artist are VARCHAR(255)
+MAX_PRICE = Decimal('99999999.99')   # DECIMAL(10,2)
+REPORT_FIELDS = ('line', 'error', 'record')
+
+
+class ImportFormatError(ValueError):
+    """Raised when the input can't be parsed as the requested format at all"""
+
+
+def detect_format(filename, default='csv'):
+    return EXTENSION_FORMATS.get(os.path.splitext(filename or '')[1].lower(), default)
+
+
+def iter_records(text_stream, fmt):
+    """Yield ``(line_number, record)`` pairs; unparseable lines yield a string record"""
+    if fmt == 'csv':
+        reader = csv.DictReader(text_stream)
+        try:
+            fieldnames = reader.fieldnames
+        except csv.Error as e:
+            raise ImportFormatError(f'Malformed CSV header: {e}')
+        missing = {'name', 'artist', 'price'} - set(fieldnames or ())
+        if missing:
+            raise ImportFormatError(f"CSV header is missing: {', '.join(sorted(missing))}")
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # The reader skips the bad line and can carry on; line_num
+                # hasn't counted it yet
+                yield reader.line_num + 1, f'Malformed CSV: {e}'
+                continue
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(text_stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, f'Invalid JSON: {e}'
+                continue
+            yield line_number, record if isinstance(record, dict) else 'Expected a JSON object'
+    else:
+        raise ImportFormatError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+
+
+def _text(record, field, required=True):
+    value = record.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f'{field} is required')
+    if '\x00' in value:
+        raise ValueError(f'{field} contains a NUL character')
+    return value
+
+
+def validate_record(record):
+    """Return the ``(name, artist, price, cover_url)`` row for a record or raise ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError(record)
+    name = _text(record, 'name')
+    artist = _text(record, 'artist')
+    for field, value in (('name', name), ('artist', artist)):
+        if len(value) > MAX_TEXT_LENGTH:
+            raise ValueError(f'{field} is longer than {MAX_TEXT_LENGTH} characters')
+    try:
+        price = Decimal(_text(record, 'price'))
+    except InvalidOperation:
+        raise ValueError('price is not a number')
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        raise ValueError(f'price must be between 0 and {MAX_PRICE}')
+    if price != price.quantize(Decimal('0.01')):
+        raise ValueError('price has more than 2 decimal places')
+    cover_url = _text(record, 'cover_url', required=False) or None
+    return name, artist, price, cover_url
+
+
+def copy_rows(conn, rows):
+    """Stream one batch of validated rows into albums with COPY and commit it"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    with conn.cursor() as cur:
+        cur.copy_expert(COPY_SQL, buffer)
+    conn.commit()
+
+
+def import_albums(conn, text_stream, fmt='csv', batch_size=IMPORT_BATCH_SIZE, error_report=None, progress=None):
+    """Import every record of ``text_stream`` into albums.
+
+    Each batch of ``batch_size`` records is validated and the valid rows are
+    copied and committed together, so a failure part-way leaves the earlier
+    batches imported. ``error_report`` is an open text file that receives a
+    CSV line per rejected record; ``progress`` is called with the running
+    totals after every batch. Returns the final totals.
+    """
+    if batch_size < 1:
+        raise ValueError(f'batch_size must be at least 1, got {batch_size}')
+    report = csv.writer(error_report) if error_report is not None else None
+    if report is not None:
+        report.writerow(REPORT_FIELDS)
+    stats = {'rows_read': 0, 'rows_imported': 0, 'rows_rejected': 0, 'batches': 0, 'seconds': 0.0}
+    started = time.monotonic()
+    batch = []
+
+    def flush():
+        if batch:
+            copy_rows(conn, batch)
+            stats['rows_imported'] += len(batch)
+            stats['batches'] += 1
+            batch.clear()
+        stats['seconds'] = round(time.monotonic() - started, 3)
+        if progress is not None:
+            progress(dict(stats))
+
+    for line_number, record in iter_records(text_stream, fmt):
+        stats['rows_read'] += 1
+        try:
+            batch.append(validate_record(record))
+        except ValueError as e:
+            stats['rows_rejected'] += 1
+            if report is not None:
+                raw = record if isinstance(record, str) else json.dumps(record, default=str)
+                report.writerow((line_number, str(e), raw))
+        if stats['rows_read'] % batch_size == 0:
+            flush()
+    if stats['rows_read'] % batch_size or not stats['rows_read']:
+        flush()
+    return stats
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, got {number}')
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-import albums into the store database with COPY.')
+    parser.add_argument('path', help="CSV or JSON Lines file, or '-' for stdin")
+    parser.add_argument('--format', choices=FORMATS, help='input format (default: from the file extension, else csv)')
+    parser.add_argument('--batch-size', type=positive_int, default=IMPORT_BATCH_SIZE, help='records per COPY batch')
+    parser.add_argument('--errors', default='import-errors.csv', help='where to write rejected records')
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    try:
+        source = sys.stdin if args.path == '-' else open(args.path, encoding='utf-8', newline='')
+    except OSError as e:
+        parser.error(f"can't open '{args.path}': {e.strerror}")
+
+    def report_progress(stats):
+        print(f"\r{stats['rows_read']:,} read, {stats['rows_imported']:,} imported, "
+              f"{stats['rows_rejected']:,} rejected ({stats['seconds']:.1f}s)", end='', file=sys.stderr, flush=True)
+
+    with source:
+        conn = psycopg2.connect(
+            host=os.environ.get('DB_HOST', 'localhost'),
+            port=os.environ.get('DB_PORT', '5432'),
+            database=os.environ.get('DB_NAME', 'music_store'),
+            user=os.environ.get('DB_USER', 'music_user'),
+            password=os.environ.get('DB_PASSWORD', 'music_password')
+        )
+        try:
+            with open(args.errors, 'w', encoding='utf-8', newline='') as errors:
+                stats = import_albums(conn, source, fmt, args.batch_size, errors, report_progress)
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            parser.error(str(e))
+        finally:
+            conn.close()
+    print(file=sys.stderr)
+    if stats['rows_rejected']:
+        print(f"Rejected records written to {args.errors}", file=sys.stderr)
+    print(json.dumps(stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+// Initialize admin user info
+function initAdminInfo() {
+    const adminUser = localStorage.getItem('adminUser');
+    if (adminUser) {
+        try {
+            const user = JSON.parse(adminUser);
+            document.getElementById('adminUsername').textContent = user.username || 'Admin';
+        } catch (e) {
+            console.error('Error parsing admin user:', e);
+        }
+    }
+}
+
+// Check if user is still authenticated
+function checkAuth() {
+    const token = localStorage.getItem('adminToken');
+    if (!token) {
+        window.location.href = '/';
+        return;
+    }
+
+    fetch('/api/verify', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ token: token })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.valid || data.user.role !== 'admin') {
+            localStorage.removeItem('adminToken');
+            localStorage.removeItem('adminUser');
+            window.location.href = '/';
+        }
+    })
+    .catch(error => {
+        console.error('Auth check failed:', error);
+        // Don't redirect immediately on network errors, just log
+        console.log('Network error during auth check, continuing...');
+    });
+}
+
+// Logout function
+function logout() {
+    const token = localStorage.getItem('adminToken');
+
+    // Call logout API
+    fetch('/admin/logout', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ token: token })
+    })
+    .then(response => response.json())
+    .then(data => {
+        // Clear local storage
+        localStorage.removeItem('adminToken');
+        localStorage.removeItem('adminUser');
+        // Redirect to home page
+        window.location.href = '/';
+    })
+    .catch(error => {
+        console.error('Logout error:', error);
+        // Clear local storage anyway and redirect
+        localStorage.removeItem('adminToken');
+        localStorage.removeItem('adminUser');
+        window.location.href = '/';
+    });
+}
+
+// Check auth every 10 minutes (less frequent to avoid constant redirects)
+setInterval(checkAuth, 600000);
+
+// Initialize on page load
+initAdminInfo();
+checkAuth();
+updateTimestamp();
+
+// Auto-refresh statistics every 30 seconds
+setInterval(refreshStats, 30000);
+
+function refreshStats() {
+    // Refresh the page to get updated statistics
+    window.location.reload();
+}
+
+function updateTimestamp() {
+    const now = new Date();
+    const timeString = now.toLocaleTimeString();
+    document.getElementById('updateTime').textContent = timeString;
+}
@@ -0,0 +1,89 @@
+// Format card number with spaces
+document.getElementById('card_number').addEventListener('input', function(e) {
+    let value = e.target.value.replace(/\s/g, '').replace(/[^0-9]/gi, '');
+    let formattedValue = value.replace(/(.{4})/g, '$1 ').trim();
+    e.target.value = formattedValue;
+});
+
+// Format expiry date
+document.getElementById('expiry').addEventListener('input', function(e) {
+    let value = e.target.value.replace(/[^0-9]/g, '');
+    if (value.length >= 2) {
+        value = value.substring(0, 2) + '/' + value.substring(2, 4);
+    }
+    e.target.value = value;
+});
+
+// Only allow numbers for CVV
+document.getElementById('cvv').addEventListener('input', function(e) {
+    e.target.value = e.target.value.replace(/[^0-9]/g, '');
+});
+
+// Same as shipping address functionality
+document.getElementById('same_as_shipping').addEventListener('change', function(e) {
+    const billingFields = document.getElementById('billing-fields');
+    if (e.target.checked) {
+        billingFields.style.display = 'none';
+        // Copy shipping values to billing
+        document.getElementById('billing_first_name').value = document.getElementById('shipping_first_name').value;
+        document.getElementById('billing_last_name').value = document.getElementById('shipping_last_name').value;
+        document.getElementById('billing_address').value = document.getElementById('shipping_address').value;
+        document.getElementById('billing_city').value = document.getElementById('shipping_city').value;
+        document.getElementById('billing_state').value = document.getElementById('shipping_state').value;
+        document.getElementById('billing_zip').value = document.getElementById('shipping_zip').value;
+        document.getElementById('billing_country').value = document.getElementById('shipping_country').value;
+    } else {
+        billingFields.style.display = 'block';
+    }
+});
+
+// Form submission with loading state
+document.getElementById('checkout-form').addEventListener('submit', function(e) {
+    const submitBtn = document.getElementById('submit-btn');
+    const btnText = document.getElementById('btn-text');
+    const loading = document.getElementById('loading');
+
+    submitBtn.disabled = true;
+    btnText.textContent = 'Processing...';
+    loading.style.display = 'block';
+});
+
+// Auto-fill with sample data for testing
+function fillSampleData() {
+    const sampleData = {
+        'email': 'test@example.com',
+        'phone': '(555) 123-4567',
+        'shipping_first_name': 'John',
+        'shipping_last_name': 'Doe',
+        'shipping_address': '123 Main Street',
+        'shipping_city': 'New York',
+        'shipping_state': 'NY',
+        'shipping_zip': '10001',
+        'shipping_country': 'US',
+        'billing_first_name': 'John',
+        'billing_last_name': 'Doe',
+        'billing_address': '123 Main Street',
+        'billing_city': 'New York',
+        'billing_state': 'NY',
+        'billing_zip': '10001',
+        'billing_country': 'US',
+        'cardholder_name': 'John Doe',
+        'card_number': '4111 1111 1111 1111',
+        'expiry': '12/25',
+        'cvv': '123'
+    };
+
+    for (const [key, value] of Object.entries(sampleData)) {
+        const element = document.getElementById(key);
+        if (element) {
+            element.value = value;
+        }
+    }
+}
+
+// Add sample data button for testing (remove in production)
+const sampleBtn = document.createElement('button');
+sampleBtn.textContent = 'Fill Sample Data (Testing)';
+sampleBtn.style.cssText = 'position: fixed; top: 20px; right: 20px; background: #28a745; color: white; border: none; padding: 10px; border-radius: 5px; cursor: pointer; z-index: 1000;';
+sampleBtn.onclick = fillSampleData;
+document.body.appendChild(sampleBtn);
@@ -0,0 +1,57 @@
+// Wait for a queued payment to be authorized, then move on to the result.
+// Each status request long-polls, so the page learns the outcome as soon
+// as the payment worker finishes without hammering the server.
+(function () {
+    const card = document.getElementById('payment-status');
+    if (!card) {
+        return;
+    }
+    const statusUrl = card.dataset.statusUrl;
+    const pollWait = card.dataset.pollWait;
+
+    function show(state) {
+        document.querySelectorAll('.payment-state').forEach(function (element) {
+            element.hidden = element.id !== 'payment-' + state;
+        });
+    }
+
+    function finish(job) {
+        if (job.status === 'succeeded') {
+            show('succeeded');
+            window.location.href = job.redirect_url;
+        } else {
+            document.getElementById('payment-error').textContent = job.error || 'Payment failed. Please try again.';
+            show('failed');
+        }
+    }
+
+    function poll() {
+        fetch(statusUrl + '?wait=' + encodeURIComponent(pollWait), {headers: {'Accept': 'application/json'}})
+            .then(function (response) {
+                if (response.status === 404) {
+                    return {done: true, status: 'failed', error: 'This payment has expired. Please check out again.'};
+                }
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function (job) {
+                if (job.done) {
+                    finish(job);
+                } else {
+                    poll();
+                }
+            })
+            .catch(function () {
+                // Gateway hiccup; try again shortly
+                setTimeout(poll, 2000);
+            });
+    }
+
+    if (card.dataset.status === 'succeeded') {
+        window.location.href = '/order_success';
+    } else if (card.dataset.status !== 'declined' && card.dataset.status !== 'failed') {
+        poll();
+    }
+})();
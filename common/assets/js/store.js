@@ -0,0 +1,436 @@
+function showTab(tabName) {
+    // Hide all content sections
+    const contentSections = document.querySelectorAll('.content-section');
+    contentSections.forEach(section => {
+        section.classList.remove('active');
+    });
+
+    // Remove active class from all tabs
+    const tabs = document.querySelectorAll('.tab');
+    tabs.forEach(tab => {
+        tab.classList.remove('active');
+    });
+
+    // Show selected content section
+    document.getElementById(tabName).classList.add('active');
+
+    // Add active class to clicked tab
+    event.target.classList.add('active');
+}
+
+function showLoginModal() {
+    document.getElementById('loginModal').style.display = 'block';
+    document.getElementById('username').focus();
+}
+
+function closeLoginModal() {
+    document.getElementById('loginModal').style.display = 'none';
+    document.getElementById('loginError').style.display = 'none';
+    document.getElementById('username').value = '';
+    document.getElementById('password').value = '';
+}
+
+function handleLogin(event) {
+    event.preventDefault();
+
+    const username = document.getElementById('username').value;
+    const password = document.getElementById('password').value;
+    const errorDiv = document.getElementById('loginError');
+
+    // Call login API
+    fetch('/api/login', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            username: username,
+            password: password
+        })
+    })
+    .then(response => {
+        if (!response.ok && response.status === 504) {
+            return response.json().then(data => {
+                throw new Error('TIMEOUT');
+            });
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (data.success) {
+            // Store token in localStorage
+            localStorage.setItem('adminToken', data.token);
+            localStorage.setItem('adminUser', JSON.stringify(data.user));
+
+            // Close modal and redirect to admin page
+            closeLoginModal();
+            window.location.href = '/admin';
+        } else if (data.timeout) {
+            showTimeoutNotification(data.service || 'users');
+            errorDiv.textContent = 'Service timeout. Please try again.';
+            errorDiv.style.display = 'block';
+        } else {
+            errorDiv.textContent = data.error || 'Login failed';
+            errorDiv.style.display = 'block';
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        if (error.message === 'TIMEOUT') {
+            showTimeoutNotification('users');
+            errorDiv.textContent = 'Service timeout. Please try again.';
+            errorDiv.style.display = 'block';
+        } else {
+            errorDiv.textContent = 'Login failed. Please try again.';
+            errorDiv.style.display = 'block';
+        }
+    });
+
+    return false;
+}
+
+// Close modal when clicking outside of it
+window.onclick = function(event) {
+    const modal = document.getElementById('loginModal');
+    if (event.target == modal) {
+        closeLoginModal();
+    }
+}
+
+function addToCart(event, form) {
+    event.preventDefault();
+
+    const formData = new FormData(form);
+
+    // Set timeout for the fetch request
+    const timeoutPromise = new Promise((_, reject) => {
+        setTimeout(() => reject(new Error('Request timeout')), 10000);
+    });
+
+    fetch('/add_to_cart', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => {
+        if (!response.ok && response.status === 504) {
+            return response.json().then(data => {
+                throw new Error('TIMEOUT');
+            });
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (data.success) {
+            showCartNotification(data.redirect_url);
+        } else if (data.timeout) {
+            showTimeoutNotification(data.service || 'cart');
+        } else {
+            alert('Error adding to cart: ' + data.error);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        if (error.message === 'TIMEOUT' || error.message === 'Request timeout') {
+            showTimeoutNotification('cart');
+        } else {
+            alert('Error adding to cart');
+        }
+    });
+
+    return false;
+}
+
+function createAlbumCard(album) {
+    // Mirrors the server-rendered album card markup
+    const card = document.createElement('div');
+    card.className = 'album-card';
+
+    const coverContainer = document.createElement('div');
+    coverContainer.className = 'album-cover-container';
+    const placeholder = document.createElement('div');
+    placeholder.className = 'album-cover-placeholder';
+    placeholder.textContent = album.name;
+    const variants = album.cover_variants;
+    if (variants || album.cover_url) {
+        const sizes = '(max-width: 480px) 100vw, 400px';
+        const srcset = list => list.map(v => v.url + ' ' + v.width + 'w').join(', ');
+        const img = document.createElement('img');
+        img.alt = album.name + ' cover';
+        img.className = 'album-cover';
+        img.loading = 'lazy';
+        let cover = img;
+        if (variants) {
+            cover = document.createElement('picture');
+            cover.className = 'album-cover-picture';
+            const source = document.createElement('source');
+            source.type = 'image/webp';
+            source.srcset = srcset(variants.webp);
+            source.sizes = sizes;
+            img.srcset = srcset(variants.jpeg);
+            img.sizes = sizes;
+            img.src = variants.jpeg[0].url;
+            cover.append(source, img);
+        } else {
+            img.src = album.cover_url;
+        }
+        img.onerror = function() {
+            cover.style.display = 'none';
+            placeholder.style.display = 'flex';
+        };
+        placeholder.style.display = 'none';
+        coverContainer.appendChild(cover);
+    }
+    coverContainer.appendChild(placeholder);
+
+    const info = document.createElement('div');
+    info.className = 'album-info';
+    const title = document.createElement('h3');
+    title.className = 'album-title';
+    title.textContent = album.name;
+    const artist = document.createElement('p');
+    artist.className = 'album-artist';
+    artist.textContent = album.artist;
+    const price = document.createElement('div');
+    price.className = 'album-price';
+    price.textContent = '$' + Number(album.price).toFixed(2);
+
+    const actions = document.createElement('div');
+    actions.className = 'album-actions';
+    actions.innerHTML = `
+        <form action="/add_to_cart" method="post" onsubmit="return addToCart(event, this)">
+            <input type="hidden" name="album_id">
+            <div style="display: flex; gap: 12px; align-items: center;">
+                <input type="number" name="quantity" value="1" min="1" class="quantity-input" placeholder="Qty">
+                <button type="submit" class="add-to-cart-btn">Add to Cart</button>
+            </div>
+        </form>
+    `;
+    actions.querySelector('input[name="album_id"]').value = album.id;
+
+    info.append(title, artist, price, actions);
+    card.append(coverContainer, info);
+    return card;
+}
+
+function initInfiniteScroll() {
+    const grid = document.getElementById('albumGrid');
+    const sentinel = document.getElementById('albumGridSentinel');
+    if (!grid || !sentinel || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    let loading = false;
+    const observer = new IntersectionObserver(entries => {
+        const cursor = sentinel.dataset.nextCursor;
+        if (!entries[0].isIntersecting || loading || !cursor) {
+            return;
+        }
+        // Filters may change while a page is loading; drop pages of the old query
+        const query = sentinel.dataset.query;
+        loading = true;
+        fetch('/api/albums?' + (query ? query + '&' : '') + 'cursor=' + encodeURIComponent(cursor))
+            .then(response => response.json())
+            .then(data => {
+                if (query !== sentinel.dataset.query) {
+                    return;
+                }
+                (data.albums || []).forEach(album => grid.appendChild(createAlbumCard(album)));
+                sentinel.dataset.nextCursor = data.next_cursor || '';
+            })
+            .then(() => {
+                loading = false;
+                rearm();
+            })
+            .catch(error => {
+                loading = false;
+                console.error('Error loading albums:', error);
+            });
+    }, { rootMargin: '600px 0px' });
+
+    // The observer only reports changes in visibility, so a sentinel still in
+    // view after a page loads (or after the filters replace the grid) would
+    // never fire again. Observing it afresh reports its current state.
+    const rearm = () => {
+        observer.unobserve(sentinel);
+        observer.observe(sentinel);
+    };
+    sentinel.addEventListener('albumgridreset', rearm);
+    observer.observe(sentinel);
+}
+
+function updateFacetCounts(form, facets) {
+    const artistSelect = form.elements.artist;
+    const selected = artistSelect.value;
+    const artists = facets.artist.slice();
+    if (selected && !artists.some(facet => facet.value === selected)) {
+        artists.push({ value: selected, count: 0 });
+    }
+    artistSelect.replaceChildren(new Option('All artists', ''),
+        ...artists.map(facet => new Option(facet.value + ' (' + facet.count + ')', facet.value)));
+    artistSelect.value = selected;
+
+    const priceSelect = form.elements.price;
+    facets.price.forEach(facet => {
+        const option = Array.from(priceSelect.options).find(o => o.value === facet.value);
+        if (option) {
+            option.textContent = facet.label + ' (' + facet.count + ')';
+        }
+    });
+}
+
+function initCatalogFilters() {
+    const form = document.getElementById('catalogFilters');
+    const grid = document.getElementById('albumGrid');
+    const sentinel = document.getElementById('albumGridSentinel');
+    const empty = document.getElementById('albumGridEmpty');
+    if (!form || !grid || !sentinel) {
+        return;
+    }
+
+    form.addEventListener('change', () => {
+        const params = new URLSearchParams();
+        new FormData(form).forEach((value, key) => {
+            if (value) {
+                params.append(key, value);
+            }
+        });
+        const query = params.toString();
+        sentinel.dataset.query = query;
+        sentinel.dataset.nextCursor = '';
+        params.set('facets', '1');
+        fetch('/api/albums?' + params)
+            .then(response => response.json())
+            .then(data => {
+                if (query !== sentinel.dataset.query) {
+                    return;
+                }
+                grid.replaceChildren(...(data.albums || []).map(createAlbumCard));
+                sentinel.dataset.nextCursor = data.next_cursor || '';
+                sentinel.dispatchEvent(new Event('albumgridreset'));
+                empty.hidden = grid.children.length > 0;
+                if (data.facets) {
+                    updateFacetCounts(form, data.facets);
+                }
+            })
+            .catch(error => console.error('Error filtering albums:', error));
+    });
+}
+
+document.addEventListener('DOMContentLoaded', initInfiniteScroll);
+document.addEventListener('DOMContentLoaded', initCatalogFilters);
+
+function loadRecentOrders() {
+    const list = document.getElementById('recentOrdersList');
+    fetch('/api/orders/recent')
+        .then(response => response.json())
+        .then(data => {
+            const orders = data.orders || [];
+            if (orders.length === 0) {
+                document.getElementById('recentOrders').style.display = 'none';
+                return;
+            }
+            orders.forEach(order => {
+                const item = document.createElement('li');
+                const title = document.createElement('strong');
+                title.textContent = order.name;
+                const price = document.createElement('span');
+                price.className = 'recent-order-price';
+                price.textContent = '$' + Number(order.price).toFixed(2);
+                item.append(order.quantity + 'x ', title, ' by ' + order.artist, price);
+                list.appendChild(item);
+            });
+        })
+        .catch(error => console.error('Error loading recent orders:', error));
+}
+
+function initRecentOrders() {
+    const section = document.getElementById('recentOrders');
+    if (!section) {
+        return;
+    }
+    if (!('IntersectionObserver' in window)) {
+        loadRecentOrders();
+        return;
+    }
+    // Only fetch the feed once it is about to scroll into view
+    const observer = new IntersectionObserver(entries => {
+        if (entries[0].isIntersecting) {
+            observer.disconnect();
+            loadRecentOrders();
+        }
+    }, { rootMargin: '200px 0px' });
+    observer.observe(section);
+}
+
+document.addEventListener('DOMContentLoaded', initRecentOrders);
+
+function showCartNotification(redirectUrl) {
+    // Remove existing notification
+    const existing = document.querySelector('.cart-notification');
+    if (existing) {
+        existing.remove();
+    }
+
+    // Create notification
+    const notification = document.createElement('div');
+    notification.className = 'cart-notification';
+    notification.innerHTML = `
+        <h3>🤘 Item Added!</h3>
+        <p>Your brutal metal album has been added to the cart!</p>
+        <a href="/cart" class="btn">View Cart</a>
+        <button class="btn btn-secondary" onclick="this.parentElement.remove()">Continue Shopping</button>
+    `;
+
+    document.body.appendChild(notification);
+
+    // Show notification
+    setTimeout(() => {
+        notification.classList.add('show');
+    }, 100);
+
+    // Auto-hide after 8 seconds
+    setTimeout(() => {
+        notification.classList.remove('show');
+        setTimeout(() => {
+            if (notification.parentElement) {
+                notification.remove();
+            }
+        }, 300);
+    }, 8000);
+}
+
+function showTimeoutNotification(service) {
+    // Remove existing timeout notification
+    const existing = document.querySelector('.timeout-notification');
+    if (existing) {
+        existing.remove();
+    }
+
+    const serviceName = service === 'cart' ? 'Cart' : 'Users';
+
+    // Create timeout notification
+    const notification = document.createElement('div');
+    notification.className = 'timeout-notification';
+    notification.innerHTML = `
+        <h3>⚠️ Service Timeout</h3>
+        <p>The ${serviceName} service did not respond within 10 seconds. The service may be unavailable or experiencing issues.</p>
+        <button onclick="this.parentElement.remove()">Close</button>
+    `;
+
+    document.body.appendChild(notification);
+
+    // Show notification
+    setTimeout(() => {
+        notification.classList.add('show');
+    }, 100);
+
+    // Auto-hide after 15 seconds
+    setTimeout(() => {
+        notification.classList.remove('show');
+        setTimeout(() => {
+            if (notification.parentElement) {
+                notification.remove();
+            }
+        }, 300);
+    }, 15000);
+}
@@ -0,0 +1,145 @@
+import gzip
+import os
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Defaults shared by every service; each can be overridden per deployment
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '4'))
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '500'))
+
+# Only text formats are worth compressing; images, archives and fonts are
+# already compressed and would just burn CPU.
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'application/x-javascript',
+    'application/xml', 'application/xhtml+xml', 'application/rss+xml',
+    'application/ld+json', 'application/x-ndjson', 'image/svg+xml',
+}
+
+
+def accept_encoding_qualities(header):
+    """Map each content coding in an Accept-Encoding header to its q-value"""
+    qualities = {}
+    for part in header.split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+class Compression:
+    """Compresses an app's text responses according to ``Accept-Encoding``.
+
+    Brotli is preferred when the ``brotli`` package is installed and the
+    client ranks it at least as high as gzip. Responses smaller than
+    ``min_size``, non-text content types, streamed or file responses and
+    anything that already carries a ``Content-Encoding`` are sent as-is.
+    """
+
+    def __init__(self, app=None, level=COMPRESS_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY,
+                 min_size=COMPRESS_MIN_SIZE):
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.min_size = min_size
+        self._lock = threading.Lock()
+        self._compressed = {}   # encoding -> [responses, bytes_in, bytes_out]
+        self._skipped = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+
+    def encodings(self):
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def negotiate(self):
+        """Pick the best supported encoding the client accepts, or None"""
+        qualities = accept_encoding_qualities(request.headers.get('Accept-Encoding', ''))
+        best, best_quality = None, 0.0
+        for encoding in self.encodings():
+            quality = qualities.get(encoding, qualities.get('*', 0.0))
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def compress_response(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not is_compressible(response.mimetype)):
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        # The body now depends on the request's Accept-Encoding, whether or
+        # not this particular client gets a compressed copy.
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate()
+        if encoding is None:
+            with self._lock:
+                self._skipped += 1
+            return response
+
+        compressed = self.compress(data, encoding)
+        if len(compressed) >= len(data):
+            with self._lock:
+                self._skipped += 1
+            return response
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        with self._lock:
+            totals = self._compressed.setdefault(encoding, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += len(data)
+            totals[2] += len(compressed)
+        return response
+
+    def stats(self):
+        with self._lock:
+            bytes_in = sum(totals[1] for totals in self._compressed.values())
+            bytes_out = sum(totals[2] for totals in self._compressed.values())
+            return {
+                'level': self.level,
+                'brotli_quality': self.brotli_quality if brotli is not None else None,
+                'min_size': self.min_size,
+                'responses_compressed': sum(totals[0] for totals in self._compressed.values()),
+                'responses_not_compressed': self._skipped,
+                'bytes_in': bytes_in,
+                'bytes_out': bytes_out,
+                'bytes_saved': bytes_in - bytes_out,
+                'ratio': round(bytes_out / bytes_in, 4) if bytes_in else 0.0,
+                'by_encoding': {
+                    encoding: {'responses': totals[0], 'bytes_in': totals[1], 'bytes_out': totals[2],
+                               'bytes_saved': totals[1] - totals[2]}
+                    for encoding, totals in self._compressed.items()
+                },
+            }
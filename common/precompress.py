@@ -0,0 +1,55 @@
+"""Write gzip and brotli siblings of compressible static files.
+
+Run at image build time:
+
+    python -m common.precompress static
+
+Each ``name.css`` gains ``name.css.gz`` (and ``name.css.br`` when the
+``brotli`` package is installed), which ``common.static_assets`` serves to
+clients that accept the encoding. Variants that would not be smaller than
+the original are not written.
+"""
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.html', '.svg', '.json', '.txt', '.xml', '.map'}
+MIN_SIZE = 256
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+def precompress(directory):
+    """Precompress every compressible file below ``directory``; returns files written"""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+            for suffix, compress in compressors():
+                compressed = compress(data)
+                if len(compressed) < len(data):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == '__main__':
+    for directory in sys.argv[1:] or ['static']:
+        count = precompress(directory)
+        print(f"Precompressed {count} files in {directory}")
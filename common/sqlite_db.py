@@ -0,0 +1,207 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Defaults shared by every SQLite-backed service; each can be overridden per deployment
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '2000'))
+SQLITE_BUSY_RETRIES = int(os.environ.get('SQLITE_BUSY_RETRIES', '3'))
+SQLITE_RETRY_BASE_DELAY_MS = int(os.environ.get('SQLITE_RETRY_BASE_DELAY_MS', '25'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '16384'))
+SQLITE_STATEMENT_CACHE_SIZE = int(os.environ.get('SQLITE_STATEMENT_CACHE_SIZE', '256'))
+SQLITE_MAX_IDLE_CONNECTIONS = int(os.environ.get('SQLITE_MAX_IDLE_CONNECTIONS', '16'))
+
+
+def is_busy_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+class _RetryingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return self.connection._retry(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.connection._retry(super().executemany, sql, seq_of_parameters)
+
+
+class _RetryingConnection(sqlite3.Connection):
+    """Connection whose statements retry with jittered backoff on SQLITE_BUSY.
+
+    Write transactions start with ``BEGIN IMMEDIATE``, so a busy error can
+    only come from the statement that tries to take the write lock, before
+    anything is held. Retrying it therefore never turns into a deadlock
+    between two readers that both want to upgrade.
+    """
+
+    database = None
+
+    def _retry(self, call, *args):
+        attempt = 0
+        while True:
+            try:
+                return call(*args)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or self.in_transaction or attempt >= self.database.busy_retries:
+                    if is_busy_error(e):
+                        self.database._count('busy_errors')
+                    raise
+            attempt += 1
+            self.database._count('busy_retries')
+            time.sleep(random.uniform(0, self.database.retry_base_delay * 2 ** attempt))
+
+    def cursor(self, factory=_RetryingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        # A busy COMMIT leaves the transaction open and may simply be retried
+        attempt = 0
+        while True:
+            try:
+                return super().commit()
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt >= self.database.busy_retries:
+                    if is_busy_error(e):
+                        self.database._count('busy_errors')
+                    raise
+            attempt += 1
+            self.database._count('busy_retries')
+            time.sleep(random.uniform(0, self.database.retry_base_delay * 2 ** attempt))
+
+
+class SQLiteDatabase:
+    """Long-lived, tuned connections to one SQLite file.
+
+    Every connection runs in WAL mode with ``synchronous=NORMAL``, so readers
+    never block the writer and commits don't fsync the main file. It also
+    gets a memory-mapped read window of ``mmap_size`` bytes, a page cache of
+    ``cache_size_kb`` KiB and a ``statement_cache_size``-entry prepared
+    statement cache that survives from one request to the next.
+
+    A thread holds one connection for the length of a ``connection()`` block
+    (nested blocks on the same thread share it) and gives it back afterwards,
+    so connections outlive the short-lived threads of the development server.
+    """
+
+    def __init__(self, path, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS, busy_retries=SQLITE_BUSY_RETRIES,
+                 retry_base_delay_ms=SQLITE_RETRY_BASE_DELAY_MS, mmap_size=SQLITE_MMAP_SIZE,
+                 cache_size_kb=SQLITE_CACHE_SIZE_KB, statement_cache_size=SQLITE_STATEMENT_CACHE_SIZE,
+                 max_idle=SQLITE_MAX_IDLE_CONNECTIONS):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.busy_retries = busy_retries
+        self.retry_base_delay = retry_base_delay_ms / 1000.0
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.statement_cache_size = statement_cache_size
+        self.max_idle = max_idle
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._in_use = 0
+        self._counters = {'connections_opened': 0, 'connections_closed': 0, 'checkouts': 0,
+                          'reused': 0, 'busy_retries': 0, 'busy_errors': 0}
+        self.journal_mode = None
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0,
+                               isolation_level='IMMEDIATE', check_same_thread=False,
+                               cached_statements=self.statement_cache_size, factory=_RetryingConnection)
+        conn.database = self
+        journal_mode = conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        with self._lock:
+            self.journal_mode = journal_mode
+            self._counters['connections_opened'] += 1
+        return conn
+
+    def _checkout(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            self._counters['checkouts'] += 1
+            if conn is not None:
+                self._counters['reused'] += 1
+        if conn is None:
+            try:
+                conn = self._open()
+            except BaseException:
+                with self._lock:
+                    self._in_use -= 1
+                raise
+        return conn
+
+    def _checkin(self, conn, broken=False):
+        with self._lock:
+            self._in_use -= 1
+            if not broken and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._counters['connections_closed'] += 1
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Use this thread's connection for the duration of a ``with`` block.
+
+        The transaction is committed on a clean exit of the outermost block
+        and rolled back if it raises.
+        """
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
+            raise
+        finally:
+            self._local.conn = None
+            self._checkin(conn, broken)
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._counters['connections_closed'] += len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, **{
+                'path': self.path,
+                'journal_mode': self.journal_mode,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'busy_timeout_ms': self.busy_timeout_ms,
+                'busy_retry_limit': self.busy_retries,
+                'mmap_size': self.mmap_size,
+                'cache_size_kb': self.cache_size_kb,
+                'statement_cache_size': self.statement_cache_size,
+            })
@@ -0,0 +1,144 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+from common.compression import accept_encoding_qualities
+
+# Files whose name already contains a SHA-256 (content-addressed covers) are
+# immutable by construction and need no ?v= fingerprint.
+CONTENT_HASH_RE = re.compile(r'[0-9a-f]{64}')
+# Precompressed siblings written by common.precompress, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+
+# CSS/JS bundles shared by the store, cart and order pages. Every service
+# serves them under the same URL, so pages relayed through the store's
+# gateway resolve them against the store and all share one cached copy.
+SHARED_ASSETS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+SHARED_ASSETS_URL_PATH = '/assets'
+
+
+def accepted_encodings():
+    """Content codings the client accepts, ignoring any with q=0"""
+    qualities = accept_encoding_qualities(request.headers.get('Accept-Encoding', ''))
+    return {coding for coding, quality in qualities.items() if quality > 0}
+
+
+class StaticAssets:
+    """Serves an app's static folder with long-lived caching.
+
+    * ``url_for('static', filename=...)`` gains a ``?v=<content hash>``
+      fingerprint, and the ``versioned`` template filter does the same for
+      literal ``/static/...`` URLs such as stored cover URLs.
+    * Requests carrying the current fingerprint, and content-addressed files,
+      are sent with ``Cache-Control: immutable``; anything else must
+      revalidate against a strong, content-derived ETag.
+    * Byte ranges and conditional requests are handled by ``send_file``.
+    * ``.br``/``.gz`` siblings produced at build time by
+      ``common.precompress`` are chosen according to ``Accept-Encoding``.
+
+    By default this takes over the app's own ``static`` endpoint; pass
+    ``directory``, ``url_path`` and ``endpoint`` to mount another folder,
+    as ``shared_assets()`` does.
+    """
+
+    def __init__(self, app=None, directory=None, url_path=None, endpoint='static'):
+        self._hashes = {}   # path -> (mtime_ns, size, sha256 hex)
+        self._lock = threading.Lock()
+        self.directory = directory
+        self.url_path = url_path
+        self.endpoint = endpoint
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if self.endpoint == 'static':
+            self.directory = app.static_folder
+            self.url_path = app.static_url_path
+            app.view_functions['static'] = self.serve
+            app.add_template_filter(self.versioned, 'versioned')
+        else:
+            app.add_url_rule(f"{self.url_path.rstrip('/')}/<path:filename>", self.endpoint, self.serve)
+        app.url_default_functions.setdefault(None, []).append(self._add_fingerprint)
+
+    def content_hash(self, path):
+        """SHA-256 of a file, recomputed only when its mtime or size change"""
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        with self._lock:
+            self._hashes[path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+        return content_hash
+
+    def fingerprint(self, filename):
+        """Short content fingerprint for a static file, or None if not needed"""
+        if CONTENT_HASH_RE.search(filename):
+            return None
+        path = safe_join(self.directory, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        return self.content_hash(path)[:12]
+
+    def _add_fingerprint(self, endpoint, values):
+        if endpoint == self.endpoint and 'filename' in values and 'v' not in values:
+            fingerprint = self.fingerprint(values['filename'])
+            if fingerprint:
+                values['v'] = fingerprint
+
+    def versioned(self, url):
+        """Add a fingerprint to a literal static URL (template filter)"""
+        prefix = self.url_path.rstrip('/') + '/'
+        if not url or not url.startswith(prefix) or '?' in url:
+            return url
+        fingerprint = self.fingerprint(url[len(prefix):])
+        return f'{url}?v={fingerprint}' if fingerprint else url
+
+    def serve(self, filename):
+        path = safe_join(self.directory, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        content_hash = self.content_hash(path)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = accepted_encodings()
+        encoding = None
+        for candidate, suffix in ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                encoding = candidate
+                path += suffix
+                break
+
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            download_name=os.path.basename(filename),
+            conditional=True,
+            etag=f'{content_hash}-{encoding}' if encoding else content_hash,
+            max_age=None
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+
+        immutable = CONTENT_HASH_RE.search(filename) or request.args.get('v') == content_hash[:12]
+        response.headers['Cache-Control'] = IMMUTABLE if immutable else REVALIDATE
+        return response
+
+
+def shared_assets(app):
+    """Serve the shared CSS/JS bundles at /assets, as ``url_for('assets', filename=...)``"""
+    return StaticAssets(app, directory=SHARED_ASSETS_FOLDER, url_path=SHARED_ASSETS_URL_PATH, endpoint='assets')
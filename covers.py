@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+# Widths generated for every uploaded cover; album cards are at most ~400px
+# wide, so 800px covers 2x displays.
+COVER_WIDTHS = (200, 400, 800)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+EXTENSION_ALIASES = {'jpeg': 'jpg'}
+
+
+def store_upload(stream, upload_folder, extension):
+    """Store an uploaded cover under its content hash.
+
+    The upload is streamed to a temporary file while it is hashed, then
+    moved to ``<aa>/<bb>/<sha256>.<ext>`` below ``upload_folder``. If that
+    file already exists the upload is a duplicate and the temporary copy is
+    discarded. Returns ``(relative_path, created)``.
+    """
+    extension = EXTENSION_ALIASES.get(extension.lower(), extension.lower())
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp_file.write(chunk)
+
+        content_hash = digest.hexdigest()
+        relative_path = os.path.join(content_hash[:2], content_hash[2:4], f'{content_hash}.{extension}')
+        final_path = os.path.join(upload_folder, relative_path)
+        if os.path.exists(final_path):
+            return relative_path, False
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        return relative_path, True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def generate_variants(source_path, url_prefix):
+    """Write resized JPEG and WebP variants next to an uploaded cover.
+
+    Returns ``{'jpeg': [...], 'webp': [...]}``, each a list of
+    ``{'width': ..., 'url': ...}`` ordered by width, suitable for srcset.
+    Covers narrower than a target width are not upscaled; the widest
+    variant is then the original width. Variants that already exist on disk
+    (a deduplicated upload) are reused rather than re-encoded.
+    """
+    directory = os.path.dirname(source_path)
+    base = os.path.splitext(os.path.basename(source_path))[0]
+    variants = {'jpeg': [], 'webp': []}
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            # Flatten transparency onto white; JPEG has no alpha channel
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+
+        widths = sorted({min(width, image.width) for width in COVER_WIDTHS})
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = None
+            for fmt, ext, options in (
+                ('jpeg', 'jpg', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+                ('webp', 'webp', {'quality': WEBP_QUALITY, 'method': 6}),
+            ):
+                filename = f'{base}_{width}w.{ext}'
+                variant_path = os.path.join(directory, filename)
+                if not os.path.exists(variant_path):
+                    if resized is None:
+                        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                    # Write under a temporary name so a concurrent request
+                    # never serves a half-written immutable file.
+                    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.variant-')
+                    os.close(fd)
+                    resized.save(temp_path, fmt.upper(), **options)
+                    os.replace(temp_path, variant_path)
+                variants[fmt].append({'width': width, 'url': f'{url_prefix}/{filename}'})
+    return variants
+
+
+def srcset(variants):
+    """Format a list of variants as an HTML srcset attribute value"""
+    return ', '.join(f"{variant['url']} {variant['width']}w" for variant in variants)
@@ -1,6 +1,9 @@
 -- Simple initialization - always recreate tables with latest data
 DROP TABLE IF EXISTS albums CASCADE;
 
+-- Trigram matching for typo-tolerant search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create albums table
 CREATE TABLE IF NOT EXISTS albums (
     id SERIAL PRIMARY KEY,
@@ -8,8 +11,15 @@ CREATE TABLE IF NOT EXISTS albums (
     artist VARCHAR(255) NOT NULL,
     price DECIMAL(10,2) NOT NULL,
     cover_url TEXT,
+    cover_variants JSONB,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Album names weigh more than artists when ranking search results. The
+    -- 'simple' configuration keeps band names unstemmed and prefix-friendly.
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(artist, '')), 'B')
+    ) STORED
 );
 
 -- Create orders table
@@ -22,8 +32,16 @@ CREATE TABLE IF NOT EXISTS orders (
 );
 
 -- Create indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_albums_artist ON albums(artist);
-CREATE INDEX IF NOT EXISTS idx_albums_price ON albums(price);
+-- /api/albums facets and sort keys; each ends in id, the keyset tie-breaker.
+-- Artist filters are served in newest-first order straight from the index.
+CREATE INDEX IF NOT EXISTS idx_albums_artist_created_at_id ON albums(artist, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_albums_price_id ON albums(price, id);
+CREATE INDEX IF NOT EXISTS idx_albums_name_id ON albums(name, id);
+-- Keyset pagination for the storefront listing (ORDER BY created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_albums_created_at_id ON albums(created_at DESC, id DESC);
+-- /api/search: full-text and prefix matches, then trigram fallback for typos
+CREATE INDEX IF NOT EXISTS idx_albums_search_vector ON albums USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_albums_search_trgm ON albums USING GIN ((name || ' ' || artist) gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_orders_album_id ON orders(album_id);
 CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);
 
@@ -0,0 +1,3 @@
+-- Resized cover variants written by the album upload.
+-- Safe to run more than once.
+ALTER TABLE albums ADD COLUMN IF NOT EXISTS cover_variants JSONB;
@@ -0,0 +1,22 @@
+-- Ranked search, keyset pagination and /api/albums facets and sort keys.
+-- Safe to run more than once. Adding the stored search_vector column
+-- rewrites albums, which is locked for writes while it runs.
+
+-- Trigram matching for typo-tolerant search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE albums ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(artist, '')), 'B')
+) STORED;
+
+-- Superseded by the composite indexes below
+DROP INDEX IF EXISTS idx_albums_artist;
+DROP INDEX IF EXISTS idx_albums_price;
+
+CREATE INDEX IF NOT EXISTS idx_albums_artist_created_at_id ON albums(artist, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_albums_price_id ON albums(price, id);
+CREATE INDEX IF NOT EXISTS idx_albums_name_id ON albums(name, id);
+CREATE INDEX IF NOT EXISTS idx_albums_created_at_id ON albums(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_albums_search_vector ON albums USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_albums_search_trgm ON albums USING GIN ((name || ' ' || artist) gin_trgm_ops);
@@ -0,0 +1,269 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection could be checked out before the timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of PostgreSQL connections.
+
+    Connections are handed out LIFO so the hottest ones stay warm and the
+    idle tail can be recycled. A connection that has sat idle for longer
+    than ``health_check_after`` seconds is pinged before it is handed out.
+    Every checkout and return closes connections idle longer than
+    ``max_idle`` (down to ``min_size``) and replaces any older than
+    ``max_lifetime``. ``min_size`` connections are opened up front and
+    topped up whenever the pool drops below it.
+    """
+
+    def __init__(self, min_size=1, max_size=10, timeout=5.0, max_idle=300.0,
+                 max_lifetime=3600.0, health_check_after=30.0, **connect_kwargs):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid pool size: min=%s max=%s' % (min_size, max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = []          # list of (conn, created_at, returned_at)
+        self._created = {}       # id(conn) -> created_at, for connections owned by the pool
+        self._in_use = 0
+        self._opening = 0        # connections being opened by _fill()
+        self._waiting = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._opened = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+
+        self._fill()
+
+    # --- internals ---
+
+    def _open(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._cond:
+            self._opened += 1
+        return conn
+
+    def _size(self):
+        return self._in_use + self._opening + len(self._idle)
+
+    def _fill(self):
+        """Open idle connections until the pool holds ``min_size``"""
+        while True:
+            with self._cond:
+                if self._closed or self._size() >= self.min_size:
+                    return
+                self._opening += 1
+            try:
+                conn = self._open()
+            except psycopg2.Error as e:
+                with self._cond:
+                    self._opening -= 1
+                    self._cond.notify()
+                # Not fatal: getconn() opens connections on demand
+                print(f"Could not open pooled database connection: {e}")
+                return
+            now = time.monotonic()
+            with self._cond:
+                self._opening -= 1
+                if self._closed:
+                    conn.close()
+                    return
+                self._created[id(conn)] = now
+                self._idle.append((conn, now, now))
+                self._cond.notify()
+
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reap(self, now):
+        """Take expired connections off the idle stack; call with ``_cond`` held.
+
+        The stack is checked from the bottom, where the connections idle the
+        longest sit, so a hot connection reused at the top doesn't shield the
+        rest from ``max_idle``. Idle expiry stops at ``min_size``; lifetime
+        expiry doesn't, ``_fill()`` replaces those. Returns the connections
+        to close once the lock is released.
+        """
+        surplus = self._size() - self.min_size
+        keep, expired = [], []
+        for entry in self._idle:
+            conn, created_at, returned_at = entry
+            if (self.max_lifetime and now - created_at > self.max_lifetime) or \
+                    (self.max_idle and now - returned_at > self.max_idle and surplus > 0):
+                expired.append(conn)
+                self._created.pop(id(conn), None)
+                surplus -= 1
+            else:
+                keep.append(entry)
+        if expired:
+            self._idle = keep
+            self._recycled += len(expired)
+        return expired
+
+    def _close_reaped(self, expired):
+        for conn in expired:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        if expired:
+            self._fill()
+
+    def _healthy(self, conn, returned_at, now):
+        if conn.closed:
+            return False
+        if now - returned_at < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._failed_health_checks += 1
+            return False
+
+    # --- public API ---
+
+    def getconn(self):
+        """Borrow a connection, blocking up to ``timeout`` seconds"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            if self._closed:
+                raise psycopg2.InterfaceError('Connection pool is closed')
+            self._waiting += 1
+            try:
+                while not self._idle and self._size() >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout('Timed out after %.1fs waiting for a database connection' % self.timeout)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            expired = self._reap(time.monotonic())
+            entry = self._idle.pop() if self._idle else None
+            self._in_use += 1
+        self._close_reaped(expired)
+
+        # Health checks and connects happen outside the lock so one slow
+        # handshake doesn't serialise every other checkout behind it.
+        try:
+            conn = None
+            recycled = False
+            while entry is not None:
+                candidate, _, returned_at = entry
+                if self._healthy(candidate, returned_at, time.monotonic()):
+                    conn = candidate
+                    break
+                recycled = True
+                with self._cond:
+                    self._recycled += 1
+                    self._discard(candidate)
+                    entry = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+                with self._cond:
+                    self._created[id(conn)] = time.monotonic()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if recycled:
+            self._fill()
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a borrowed connection to the pool"""
+        with self._cond:
+            self._in_use -= 1
+            created_at = self._created.get(id(conn))
+            discarded = created_at is None or close or self._closed or conn.closed
+            if discarded:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            expired = self._reap(time.monotonic())
+            self._cond.notify()
+        self._close_reaped(expired)
+        if discarded:
+            self._fill()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a ``with`` block.
+
+        The transaction is committed on a clean exit and rolled back if the
+        block raises; connections left in a broken state are not reused.
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            # Includes GeneratorExit, when a streamed response holding the
+            # connection is abandoned by its client part-way.
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken or conn.closed != 0)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size(),
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'connections_opened': self._opened,
+                'connections_recycled': self._recycled,
+                'failed_health_checks': self._failed_health_checks,
+                'wait_seconds_total': round(self._wait_total, 6),
+                'wait_seconds_max': round(self._wait_max, 6),
+                'wait_seconds_avg': round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+            }
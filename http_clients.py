@@ -0,0 +1,339 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http import cookiejar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class PoolExhausted(requests.ConnectionError):
+    """Raised when no connection slot to a downstream frees up in time"""
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a downstream whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for one downstream service.
+
+    Every call is recorded for ``window_seconds``. Once the window holds at
+    least ``min_requests`` calls and either the share of failures reaches
+    ``error_rate`` or the share of calls slower than ``slow_call_seconds``
+    reaches ``slow_call_rate``, the circuit opens and calls fail fast for
+    ``open_seconds``. It then turns half-open and lets ``half_open_max_calls``
+    probes through: a successful probe closes it, a failed one reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window_seconds=30.0, min_requests=10, error_rate=0.5,
+                 slow_call_seconds=5.0, slow_call_rate=0.5, open_seconds=15.0,
+                 half_open_max_calls=1):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._calls = deque()   # (finished_at, failed, slow)
+        self._failed = 0
+        self._slow = 0
+        self._rejected = 0
+        self._times_opened = 0
+
+    def _prune(self, now):
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            _, failed, slow = self._calls.popleft()
+            self._failed -= failed
+            self._slow -= slow
+
+    def _open(self, now):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._times_opened += 1
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError.
+
+        Returns a probe token for a half-open probe, else None; pass it on
+        to ``record``.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+                self._state = self.HALF_OPEN
+                self._probes = 0
+            if self._state == self.OPEN or (self._state == self.HALF_OPEN and self._probes >= self.half_open_max_calls):
+                self._rejected += 1
+                raise CircuitOpenError(f'{self.name.title()} service circuit is open; failing fast')
+            if self._state == self.HALF_OPEN:
+                self._probes += 1
+                # Identifies this half-open period; _open() moves it on
+                return self._times_opened
+            return None
+
+    def record(self, failed, latency, probe=None):
+        """Record the outcome of an admitted call.
+
+        Only the probes of the current half-open period may close or reopen
+        the circuit. Calls admitted while it was closed count towards the
+        window even if they finish after it opened, and a probe outliving
+        its half-open period is ignored.
+        """
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if probe is not None:
+                if self._state == self.HALF_OPEN and probe == self._times_opened:
+                    self._probes -= 1
+                    if failed or slow:
+                        self._open(now)
+                    else:
+                        self._state = self.CLOSED
+                        self._calls.clear()
+                        self._failed = self._slow = 0
+                return
+            self._calls.append((now, failed, slow))
+            self._failed += failed
+            self._slow += slow
+            self._prune(now)
+            total = len(self._calls)
+            if self._state == self.CLOSED and total >= self.min_requests:
+                if self._failed / total >= self.error_rate or self._slow / total >= self.slow_call_rate:
+                    self._open(now)
+
+    def stats(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                'state': self._state,
+                'window_calls': len(self._calls),
+                'window_failures': self._failed,
+                'window_slow_calls': self._slow,
+                'rejected': self._rejected,
+                'times_opened': self._times_opened,
+            }
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class ServiceClient:
+    """Process-wide keep-alive HTTP client for one downstream service.
+
+    Wraps a ``requests.Session`` whose urllib3 pool keeps up to
+    ``max_connections`` sockets open to the service. The same number of
+    requests may be in flight at once; further callers wait up to
+    ``pool_timeout`` seconds for a slot and then get ``PoolExhausted``.
+    """
+
+    def __init__(self, name, base_url, max_connections=20, connect_timeout=3.0,
+                 read_timeout=10.0, pool_timeout=3.0, breaker=None, hedge_after=0.0):
+        self.name = name
+        self.breaker = breaker
+        self.hedge_after = hedge_after
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+
+        self.session = requests.Session()
+        # The session is shared by every user of the store, so it must never
+        # remember cookies set by a downstream for one of them.
+        self.session.cookies.set_policy(cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, max_retries=0)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self._hedge_executor = ThreadPoolExecutor(max_workers=max_connections,
+                                                  thread_name_prefix=f'{name}-hedge') if hedge_after else None
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self._requests = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._pool_exhausted = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._wait_total = 0.0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def _acquire_slot(self):
+        started = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        acquired = self._slots.acquire(timeout=self.pool_timeout)
+        waited = time.monotonic() - started
+        with self._lock:
+            self._waiting -= 1
+            self._wait_total += waited
+            if not acquired:
+                self._pool_exhausted += 1
+                self._errors += 1
+        if not acquired:
+            raise PoolExhausted(f'No free connection to {self.name} service after {self.pool_timeout:g}s')
+
+    def _finish(self, started):
+        latency = time.monotonic() - started
+        with self._lock:
+            self._in_flight -= 1
+            self._requests += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+        self._slots.release()
+
+    def _finish_on_close(self, response, started):
+        # A streamed body keeps its connection busy until it is fully relayed,
+        # so the slot is only given back once the response is closed.
+        close = response.close
+        finished = []
+
+        def close_and_finish():
+            try:
+                close()
+            finally:
+                if not finished:
+                    finished.append(True)
+                    self._finish(started)
+
+        response.close = close_and_finish
+
+    def request(self, method, path, long_poll=0.0, **kwargs):
+        """Send a request to ``base_url + path`` over the pooled session.
+
+        With ``stream=True`` the caller must close the response when done.
+        ``long_poll`` is how many seconds the service may deliberately hold
+        the request; it extends the default read timeout and is left out of
+        the latency the circuit breaker sees.
+        """
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout + long_poll))
+        probe = self.breaker.before_call() if self.breaker is not None else None
+        try:
+            self._acquire_slot()
+        except PoolExhausted:
+            if self.breaker is not None:
+                self.breaker.record(True, 0.0, probe)
+            raise
+        started = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+        except requests.Timeout:
+            with self._lock:
+                self._timeouts += 1
+                self._errors += 1
+            self._record(True, started, long_poll, probe)
+            self._finish(started)
+            raise
+        except BaseException:
+            with self._lock:
+                self._errors += 1
+            self._record(True, started, long_poll, probe)
+            self._finish(started)
+            raise
+        self._record(response.status_code >= 500, started, long_poll, probe)
+        if kwargs.get('stream'):
+            self._finish_on_close(response, started)
+        else:
+            self._finish(started)
+        return response
+
+    def _record(self, failed, started, long_poll=0.0, probe=None):
+        if self.breaker is not None:
+            self.breaker.record(failed, max(time.monotonic() - started - long_poll, 0.0), probe)
+
+    def hedged_request(self, method, path, **kwargs):
+        """Send an idempotent request, racing a second copy if the first is slow.
+
+        If no response has arrived after ``hedge_after`` seconds a duplicate
+        request is sent and whichever answers first wins; the other response
+        is closed when it arrives. Only use this for idempotent requests.
+        """
+        if not self.hedge_after:
+            return self.request(method, path, **kwargs)
+        futures = [self._hedge_executor.submit(self.request, method, path, **kwargs)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            with self._lock:
+                self._hedges += 1
+            futures.append(self._hedge_executor.submit(self.request, method, path, **kwargs))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer the original request when both finished together
+            for future in sorted(done, key=futures.index):
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for other in pending:
+                    other.add_done_callback(_close_response)
+                for other in done:
+                    if other is not future:
+                        _close_response(other)
+                if future is not futures[0]:
+                    with self._lock:
+                        self._hedge_wins += 1
+                return future.result()
+        raise error
+
+    def get(self, path, hedge=False, **kwargs):
+        if hedge:
+            return self.hedged_request('GET', path, **kwargs)
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def stats(self):
+        pool_manager = self.adapter.poolmanager
+        pools = [pool for pool in (pool_manager.pools.get(key) for key in pool_manager.pools.keys()) if pool is not None]
+        with self._lock:
+            return {
+                'base_url': self.base_url,
+                'max_connections': self.max_connections,
+                'connect_timeout': self.connect_timeout,
+                'read_timeout': self.read_timeout,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'requests': self._requests,
+                'errors': self._errors,
+                'timeouts': self._timeouts,
+                'pool_exhausted': self._pool_exhausted,
+                'latency_seconds_avg': round(self._latency_total / self._requests, 6) if self._requests else 0.0,
+                'latency_seconds_max': round(self._latency_max, 6),
+                'slot_wait_seconds_total': round(self._wait_total, 6),
+                'hedge_after_seconds': self.hedge_after,
+                'hedges': self._hedges,
+                'hedge_wins': self._hedge_wins,
+                'circuit_breaker': self.breaker.stats() if self.breaker is not None else None,
+                'connections_opened': sum(pool.num_connections for pool in pools),
+                'idle_connections': sum(sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                                        for pool in pools if pool.pool is not None),
+            }
@@ -1,16 +1,29 @@
-from flask import Flask, render_template_string, request, jsonify
-import sqlite3
+from flask import Flask, render_template, request, jsonify
 import os
+import sys
 import json
 from datetime import datetime
+from jinja2 import DictLoader
+
+# Modules shared between services live in ../common in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.compression import Compression
+from common.sqlite_db import SQLiteDatabase
+from common.static_assets import shared_assets
 
 app = Flask(__name__)
+# gzip/brotli for HTML and JSON responses (see common/compression.py)
+compression = Compression(app)
+# CSS/JS bundles shared with the store pages, served at /assets
+assets = shared_assets(app)
 
 # Configuration
 ORDER_DB_PATH = os.environ.get('ORDER_DB_PATH', 'orders.db')
+# Long-lived WAL connections with busy retries (see common/sqlite_db.py)
+db = SQLiteDatabase(ORDER_DB_PATH)
 
 def init_order_db():
-    with sqlite3.connect(ORDER_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS orders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,6 +43,7 @@ def init_order_db():
             quantity INTEGER NOT NULL,
             FOREIGN KEY(order_id) REFERENCES orders(id)
         )''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id)')
         conn.commit()
 
 init_order_db()
@@ -60,7 +74,7 @@ def create_order():
         # Create order
         order_number = generate_order_number()
         
-        with sqlite3.connect(ORDER_DB_PATH) as conn:
+        with db.connection() as conn:
             c = conn.cursor()
             
             # Insert order
@@ -94,7 +108,7 @@ def create_order():
 def get_orders():
     """API endpoint to get all orders"""
     try:
-        with sqlite3.connect(ORDER_DB_PATH) as conn:
+        with db.connection() as conn:
             c = conn.cursor()
             orders = c.execute('''
                 SELECT o.id, o.order_number, o.total_amount, o.status, o.created_at,
@@ -117,11 +131,69 @@ def get_orders():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/orders/with-items', methods=['GET'])
+def get_orders_with_items():
+    """API endpoint to get all orders with their items in a single query.
+    
+    Pass ``?include_totals=1`` to also get order count, item count and revenue.
+    """
+    include_totals = request.args.get('include_totals', '').lower() in ('1', 'true', 'yes')
+    try:
+        with db.connection() as conn:
+            c = conn.cursor()
+            rows = c.execute('''
+                SELECT o.id, o.order_number, o.total_amount, o.status, o.created_at,
+                       oi.album_id, oi.album_name, oi.artist, oi.price, oi.quantity
+                FROM orders o
+                LEFT JOIN order_items oi ON o.id = oi.order_id
+                ORDER BY o.created_at DESC, o.id DESC, oi.id
+            ''').fetchall()
+        
+        orders = []
+        by_id = {}
+        revenue = 0
+        item_count = 0
+        for row in rows:
+            order = by_id.get(row[0])
+            if order is None:
+                order = {
+                    'id': row[0],
+                    'order_number': row[1],
+                    'total_amount': row[2],
+                    'status': row[3],
+                    'created_at': row[4],
+                    'items': []
+                }
+                by_id[row[0]] = order
+                orders.append(order)
+            if row[5] is not None:
+                order['items'].append({
+                    'album_id': row[5],
+                    'album_name': row[6],
+                    'artist': row[7],
+                    'price': row[8],
+                    'quantity': row[9]
+                })
+                revenue += row[8] * row[9]
+                item_count += 1
+        
+        result = {'orders': orders}
+        if include_totals:
+            result['totals'] = {
+                'order_count': len(orders),
+                'item_count': item_count,
+                'revenue': round(revenue, 2)
+            }
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     """API endpoint to get a specific order with items"""
     try:
-        with sqlite3.connect(ORDER_DB_PATH) as conn:
+        with db.connection() as conn:
             c = conn.cursor()
             
             # Get order details
@@ -167,7 +239,7 @@ def update_order_status(order_id):
         if not new_status:
             return jsonify({'error': 'Status is required'}), 400
         
-        with sqlite3.connect(ORDER_DB_PATH) as conn:
+        with db.connection() as conn:
             c = conn.cursor()
             c.execute('UPDATE orders SET status = ? WHERE id = ?', (new_status, order_id))
             
@@ -184,7 +256,7 @@ def update_order_status(order_id):
 @app.route('/')
 def orders_dashboard():
     """Dashboard to view all orders"""
-    with sqlite3.connect(ORDER_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         orders = c.execute('''
             SELECT o.id, o.order_number, o.total_amount, o.status, o.created_at,
@@ -195,12 +267,12 @@ def orders_dashboard():
             ORDER BY o.created_at DESC
         ''').fetchall()
     
-    return render_template_string(ORDERS_DASHBOARD_HTML, orders=orders)
+    return render_template('orders_dashboard.html', orders=orders)
 
 @app.route('/order/<int:order_id>')
 def order_detail(order_id):
     """Detailed view of a specific order"""
-    with sqlite3.connect(ORDER_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         
         # Get order details
@@ -218,7 +290,7 @@ def order_detail(order_id):
             FROM order_items WHERE order_id = ?
         ''', (order_id,)).fetchall()
     
-    return render_template_string(ORDER_DETAIL_HTML, order=order, items=items)
+    return render_template('order_detail.html', order=order, items=items)
 
 # HTML Templates
 ORDERS_DASHBOARD_HTML = '''
@@ -229,177 +301,8 @@ ORDERS_DASHBOARD_HTML = '''
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Orders Dashboard - Metal Music Store</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #ffffff;
-            color: #1a1a1a;
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-
-        /* Header */
-        .header {
-            background: #1a1a1a;
-            color: white;
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            box-shadow: 0 2px 20px rgba(0,0,0,0.3);
-            margin-bottom: 40px;
-            text-align: center;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            font-weight: 800;
-            margin-bottom: 10px;
-            color: #ffffff;
-            letter-spacing: -0.5px;
-        }
-
-        .dashboard-card {
-            background: white;
-            border-radius: 16px;
-            padding: 30px;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-            border: 1px solid #e1e5e9;
-        }
-
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-
-        .stat-card {
-            background: white;
-            color: #1a1a1a;
-            padding: 20px;
-            border-radius: 12px;
-            text-align: center;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        }
-
-        .stat-number {
-            font-size: 2.5rem;
-            font-weight: 800;
-            margin-bottom: 5px;
-            color: #667eea;
-        }
-
-        .stat-label {
-            font-size: 1rem;
-            color: #666;
-            font-weight: 600;
-        }
-
-        .orders-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }
-
-        .orders-table th,
-        .orders-table td {
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #e1e5e9;
-            color: #1a1a1a;
-        }
-
-        .orders-table th {
-            background: #f8f9fa;
-            font-weight: 700;
-            color: #1a1a1a;
-        }
-
-        .orders-table tr:hover {
-            background: #f8f9fa;
-        }
-
-        .status-badge {
-            padding: 4px 8px;
-            border-radius: 12px;
-            font-size: 0.8rem;
-            font-weight: 500;
-        }
-
-        .status-pending {
-            background: #fff3cd;
-            color: #856404;
-        }
-
-        .status-confirmed {
-            background: #d1ecf1;
-            color: #0c5460;
-        }
-
-        .status-shipped {
-            background: #d4edda;
-            color: #155724;
-        }
-
-        .status-delivered {
-            background: #c3e6cb;
-            color: #155724;
-        }
-
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 12px 20px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            font-weight: 600;
-            text-decoration: none;
-            display: inline-block;
-            transition: all 0.3s ease;
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        .empty-state {
-            text-align: center;
-            padding: 60px 20px;
-            color: #666;
-        }
-
-        @media (max-width: 768px) {
-            .orders-table {
-                font-size: 0.9rem;
-            }
-            
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .container {
-                padding: 0 16px;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/orders-dashboard.css') }}">
 </head>
 <body>
     <div class="container">
@@ -478,186 +381,8 @@ ORDER_DETAIL_HTML = '''
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Order Details - Metal Music Store</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #ffffff;
-            color: #1a1a1a;
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-
-        /* Header */
-        .header {
-            background: #1a1a1a;
-            color: white;
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            box-shadow: 0 2px 20px rgba(0,0,0,0.3);
-            margin-bottom: 40px;
-            text-align: center;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            font-weight: 800;
-            margin-bottom: 10px;
-            color: #ffffff;
-            letter-spacing: -0.5px;
-        }
-
-        .order-card {
-            background: white;
-            border-radius: 16px;
-            padding: 30px;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-            border: 1px solid #e1e5e9;
-        }
-
-        .order-header {
-            background: white;
-            border-radius: 12px;
-            padding: 20px;
-            margin-bottom: 30px;
-            border-left: 4px solid #667eea;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        }
-
-        .order-header h3 {
-            color: #1a1a1a;
-            margin-bottom: 15px;
-            font-weight: 700;
-        }
-
-        .order-info {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 20px;
-        }
-
-        .info-item {
-            margin-bottom: 10px;
-        }
-
-        .info-label {
-            font-weight: 600;
-            color: #555;
-        }
-
-        .info-value {
-            color: #333;
-        }
-
-        .items-section {
-            margin-top: 30px;
-        }
-
-        .items-section h3 {
-            color: #667eea;
-            margin-bottom: 20px;
-        }
-
-        .item-list {
-            list-style: none;
-        }
-
-        .item {
-            background: white;
-            padding: 15px;
-            border-radius: 8px;
-            margin-bottom: 10px;
-            border-left: 4px solid #667eea;
-            border: 1px solid #e1e5e9;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-        }
-
-        .item-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 5px;
-        }
-
-        .item-name {
-            font-weight: 600;
-            color: #333;
-        }
-
-        .item-price {
-            color: #667eea;
-            font-weight: bold;
-        }
-
-        .item-details {
-            color: #666;
-            font-size: 0.9rem;
-        }
-
-        .order-total {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            border-radius: 12px;
-            margin-top: 30px;
-            text-align: center;
-        }
-
-        .total-amount {
-            font-size: 2rem;
-            font-weight: bold;
-            margin-bottom: 5px;
-        }
-
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 14px 20px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 1rem;
-            font-weight: 600;
-            text-decoration: none;
-            display: inline-block;
-            margin-top: 20px;
-            transition: all 0.3s ease;
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        }
-
-        @media (max-width: 768px) {
-            .order-info {
-                grid-template-columns: 1fr;
-            }
-            
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .container {
-                padding: 0 16px;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/base.css') }}">
+    <link rel="stylesheet" href="{{ url_for('assets', filename='css/order-detail.css') }}">
 </head>
 <body>
     <div class="container">
@@ -720,5 +445,22 @@ ORDER_DETAIL_HTML = '''
 </html>
 '''
 
+# Compile every template once at startup; render_template then reuses the
+# compiled code from the Jinja cache instead of reparsing on each request.
+app.jinja_loader = DictLoader({
+    'orders_dashboard.html': ORDERS_DASHBOARD_HTML,
+    'order_detail.html': ORDER_DETAIL_HTML
+})
+for template_name in app.jinja_loader.list_templates():
+    app.jinja_env.get_template(template_name)
+
+@app.route('/metrics')
+def metrics():
+    """Runtime statistics for scraping"""
+    return jsonify({
+        'compression': compression.stats(),
+        'sqlite': db.stats()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True) 
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""Run the store service in asynchronous gateway mode.
+
+Every request is handled by a gevent greenlet instead of an OS thread, and
+the socket, ``requests`` and psycopg2 calls underneath are patched to yield
+while they wait on I/O. A checkout blocked on the cart service for seconds
+costs a few kilobytes of greenlet stack rather than a worker thread, so one
+process can hold thousands of proxied requests in flight. Routes, URLs and
+the timeout/504 handling are exactly those of app.py.
+
+    STORE_SERVER_MODE=async python serve_async.py
+"""
+from gevent import monkey
+monkey.patch_all()
+
+from psycogreen.gevent import patch_psycopg
+patch_psycopg()
+
+import os
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+# Greenlets make concurrent upstream requests cheap, so allow far more of
+# them per downstream than the threaded server's default.
+os.environ.setdefault('HTTP_MAX_CONNECTIONS', '500')
+
+from app import app
+
+ASYNC_MAX_CONCURRENCY = int(os.environ.get('ASYNC_MAX_CONCURRENCY', '2000'))
+PORT = int(os.environ.get('PORT', '5000'))
+
+if __name__ == '__main__':
+    server = WSGIServer(('0.0.0.0', PORT), app, spawn=Pool(ASYNC_MAX_CONCURRENCY))
+    print(f"Store service listening on :{PORT} (async gateway mode, up to {ASYNC_MAX_CONCURRENCY} concurrent requests)")
+    server.serve_forever()
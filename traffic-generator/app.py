@@ -9,10 +9,20 @@ import threading
 import time
 import random
 import os
+import sys
 from datetime import datetime
 import requests
 
+# Modules shared between services live in ../common in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.compression import Compression
+from common.static_assets import StaticAssets
+
 app = Flask(__name__, static_folder='static', template_folder='static')
+# Fingerprinted, immutable and precompressed /static (see common/static_assets.py)
+static_assets = StaticAssets(app)
+# gzip/brotli for HTML and JSON responses (see common/compression.py)
+compression = Compression(app)
 
 # Configuration
 STORE_URL = os.getenv('STORE_SERVICE_URL', 'http://music-store-1-service:5000')
@@ -533,5 +543,12 @@ def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'})
 
+@app.route('/metrics')
+def metrics():
+    """Runtime statistics for scraping"""
+    return jsonify({
+        'compression': compression.stats()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5004, debug=False)
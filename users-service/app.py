@@ -1,19 +1,28 @@
 from flask import Flask, request, jsonify, session
-import sqlite3
 import os
+import sys
 import hashlib
 import secrets
 from functools import wraps
 
+# Modules shared between services live in ../common in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.compression import Compression
+from common.sqlite_db import SQLiteDatabase
+
 app = Flask(__name__)
 app.secret_key = 'users-secret-key-here'
+# gzip/brotli for JSON responses (see common/compression.py)
+compression = Compression(app)
 
 # Configuration
 USERS_DB_PATH = os.environ.get('USERS_DB_PATH', 'users.db')
+# Long-lived WAL connections with busy retries (see common/sqlite_db.py)
+db = SQLiteDatabase(USERS_DB_PATH)
 
 def init_users_db():
     """Initialize the users database with default admin user"""
-    with sqlite3.connect(USERS_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -59,7 +68,7 @@ def login():
     username = data['username']
     password = data['password']
     
-    with sqlite3.connect(USERS_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         user = c.execute('SELECT id, username, password_hash, role FROM users WHERE username = ?', 
                         (username,)).fetchone()
@@ -76,7 +85,7 @@ def login():
     session_token = generate_session_token()
     
     # Store session in database (in production, use Redis or similar)
-    with sqlite3.connect(USERS_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS sessions (
             token TEXT PRIMARY KEY,
@@ -106,7 +115,7 @@ def logout():
     
     token = data['token']
     
-    with sqlite3.connect(USERS_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         c.execute('DELETE FROM sessions WHERE token = ?', (token,))
         conn.commit()
@@ -123,7 +132,7 @@ def verify_token():
     
     token = data['token']
     
-    with sqlite3.connect(USERS_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         session_data = c.execute('''
             SELECT s.user_id, u.username, u.role 
@@ -156,7 +165,7 @@ def get_users():
         return jsonify({'error': 'Token is required'}), 401
     
     # Verify token and check if user is admin
-    with sqlite3.connect(USERS_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         session_data = c.execute('''
             SELECT s.user_id, u.username, u.role 
@@ -174,7 +183,7 @@ def get_users():
         return jsonify({'error': 'Admin access required'}), 403
     
     # Get all users
-    with sqlite3.connect(USERS_DB_PATH) as conn:
+    with db.connection() as conn:
         c = conn.cursor()
         users = c.execute('SELECT id, username, role, created_at FROM users').fetchall()
     
@@ -195,5 +204,13 @@ def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'users-service'})
 
+@app.route('/metrics')
+def metrics():
+    """Runtime statistics for scraping"""
+    return jsonify({
+        'compression': compression.stats(),
+        'sqlite': db.stats()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5003, debug=True) 
\ No newline at end of file